@@ -0,0 +1,2 @@
+# Kept free of imports so `emostim <command>` only loads what that command needs
+__version__ = "0.1.0"
@@ -0,0 +1,157 @@
+import json
+import zlib
+import argparse
+import numpy as np
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS, parse_emotion_batch, drop_incomplete
+from .prediction_reader import iter_predictions
+from .ground_truth import clip_name, load_ground_truth
+from .timeline import split_segment, segment_key
+
+# Adaptive early stopping over prompt templates. Each video gets its templates in
+# a random (but per-video reproducible) order; after every response the running
+# per-emotion mean and variance are updated, and the video stops once the
+# normal-approximation confidence interval of every emotion's mean is at most
+# +/- tolerance wide (with at least min_templates responses), or after
+# max_templates. run_inference.py --adaptive uses this online; running this
+# script on a full predictions file replays the rule offline and reports the
+# calls saved and the error against the full-template averages.
+
+TOLERANCE = 0.25
+MIN_TEMPLATES = 3
+MAX_TEMPLATES = 20
+Z = 1.96
+
+
+class RunningStats:
+    # Welford's algorithm per emotion; emotions missing from a response are
+    # left untouched
+    def __init__(self):
+        self.calls = 0
+        self.count = np.zeros(NUM_EMOTIONS, dtype=np.int64)
+        self.mean = np.zeros(NUM_EMOTIONS, dtype=np.float64)
+        self.m2 = np.zeros(NUM_EMOTIONS, dtype=np.float64)
+
+    def update(self, scores, mask):
+        self.calls += 1
+        self.count += mask
+        delta = np.where(mask, scores - self.mean, 0.0)
+        self.mean += np.divide(delta, self.count, out=np.zeros(NUM_EMOTIONS), where=self.count > 0)
+        self.m2 += np.where(mask, delta * (scores - self.mean), 0.0)
+
+    def half_width(self, z=Z):
+        variance = np.divide(self.m2, self.count - 1, out=np.full(NUM_EMOTIONS, np.inf), where=self.count > 1)
+        return z * np.sqrt(np.divide(variance, self.count, out=np.full(NUM_EMOTIONS, np.inf), where=self.count > 0))
+
+    def converged(self, tolerance=TOLERANCE, min_templates=MIN_TEMPLATES, z=Z):
+        return bool(self.count.min() >= min_templates and (self.half_width(z) <= tolerance).all())
+
+    def done(self, tolerance=TOLERANCE, min_templates=MIN_TEMPLATES, max_templates=MAX_TEMPLATES, z=Z):
+        return self.calls >= max_templates or self.converged(tolerance, min_templates, z)
+
+
+def unit_name(video):
+    # Clip name, keeping the time range of a windowed segment. It only seeds the
+    # template order, so a video gets the same order whether it is recorded by
+    # path or by file name; videos are grouped and keyed by their full key.
+    base, start, end = split_segment(video)
+    return clip_name(base) if start is None else segment_key(clip_name(base), start, end)
+
+
+def template_order(n_templates, video, seed=0):
+    rng = np.random.default_rng([seed, zlib.crc32(unit_name(video).encode("utf-8"))])
+    return rng.permutation(n_templates)
+
+
+def summarize(video_stats, tolerance=TOLERANCE, min_templates=MIN_TEMPLATES, z=Z):
+    # get_scores.py layout plus the number of templates queried per video, keyed
+    # by the full video key (manifest path plus the range of a segment)
+    summary = {}
+    for video, stats in video_stats.items():
+        means = np.where(stats.count > 0, stats.mean, np.nan)
+        summary[video] = {
+            **{emotion: float(score) for emotion, score in zip(EMOTION_KEYS, means)},
+            "templates_used": stats.calls,
+            "converged": stats.converged(tolerance, min_templates, z),
+        }
+    return summary
+
+
+def simulate(pred_path, model_name, tolerance=TOLERANCE, min_templates=MIN_TEMPLATES,
+             max_templates=MAX_TEMPLATES, z=Z, seed=0, min_emotions=NUM_EMOTIONS):
+    # Replays the stopping rule on complete predictions. Returns {video: (full
+    # means, adaptive RunningStats, templates available)}.
+    prompts, videos, texts = {}, {}, []
+    for model, video, entry in iter_predictions(pred_path):
+        if model != model_name:
+            continue
+        videos.setdefault(video, []).append(len(texts))
+        prompts.setdefault(entry["prompt"], len(prompts))
+        texts.append(entry["prediction"])
+    scores, mask = parse_emotion_batch(texts, dtype=np.float64)
+    drop_incomplete(mask, min_emotions)
+
+    results = {}
+    for video, rows in videos.items():
+        rows = np.array(rows)
+        counts = mask[rows].sum(axis=0)
+        full = np.divide(np.where(mask[rows], scores[rows], 0.0).sum(axis=0), counts,
+                         out=np.full(NUM_EMOTIONS, np.nan), where=counts > 0)
+        stats = RunningStats()
+        for i in rows[template_order(len(rows), video, seed)]:
+            if stats.done(tolerance, min_templates, max_templates, z):
+                break
+            stats.update(scores[i], mask[i])
+        results[video] = (full, stats, len(rows))
+    return results
+
+
+def main(pred_path, model_name, tolerance, min_templates, max_templates, z, seed, gt_path=None, out_path=None):
+    results = simulate(pred_path, model_name, tolerance, min_templates, max_templates, z, seed)
+    if not results:
+        raise SystemExit(f"No predictions for model {model_name} in {pred_path}")
+
+    full = np.stack([full for full, _, _ in results.values()])
+    adaptive = np.stack([np.where(stats.count > 0, stats.mean, np.nan) for _, stats, _ in results.values()])
+    used = np.array([stats.calls for _, stats, _ in results.values()])
+    available = np.array([n for _, _, n in results.values()])
+    converged = np.array([stats.converged(tolerance, min_templates, z) for _, stats, _ in results.values()])
+
+    print(f"videos: {len(results)}, converged: {converged.sum()}")
+    print(f"templates used: {used.sum()} of {available.sum()} "
+          f"(mean {used.mean():.2f} per video, {available.sum() / used.sum():.2f}x fewer calls)")
+    error = np.abs(adaptive - full)
+    print(f"abs. difference to full average: mean {np.nanmean(error):.4f}, max {np.nanmax(error):.4f}")
+
+    if gt_path:
+        ground_truth = load_ground_truth(gt_path)
+        rows = [ground_truth.row(video) for video in results]
+        keep = np.array([row is not None for row in rows])
+        gt = ground_truth.scores[[row for row in rows if row is not None]]
+        print(f"MAE vs ground truth on {keep.sum()} videos: "
+              f"full {np.nanmean(np.abs(full[keep] - gt)):.4f}, adaptive {np.nanmean(np.abs(adaptive[keep] - gt)):.4f}")
+
+    if out_path:
+        with open(out_path, "w") as f:
+            json.dump(summarize({video: stats for video, (_, stats, _) in results.items()},
+                                tolerance, min_templates, z), f, indent=2)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Replay adaptive template stopping on full predictions")
+    parser.add_argument("--pred", type=str, required=True, help="Path to predictions JSON/JSONL")
+    parser.add_argument("--model", type=str, required=True, help="Model to replay")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Target CI half-width per emotion")
+    parser.add_argument("--min-templates", type=int, default=MIN_TEMPLATES, help="Templates queried before stopping")
+    parser.add_argument("--max-templates", type=int, default=MAX_TEMPLATES, help="Cap on templates per video")
+    parser.add_argument("--z", type=float, default=Z, help="Normal quantile of the confidence interval")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the per-video template order")
+    parser.add_argument("--gt", type=str, help="Optional ground truth (test JSON or xlsx) to compare MAE")
+    parser.add_argument("--out", type=str, help="Save adaptive per-video scores and templates used")
+
+    args = parser.parse_args(argv)
+    main(args.pred, args.model, args.tolerance, args.min_templates, args.max_templates, args.z, args.seed,
+         args.gt, args.out)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,284 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+from . import instrument
+from .constants import EMOTION_KEYS, NUM_EMOTIONS, SHORT_EMOTION_NAMES
+from .ground_truth import clip_name, file_sha256
+
+# Per-annotator ratings of the EmoStim clips (Annotated99Clips.xlsx). The sheet is
+# read as a long table with one row per (annotator, clip): a clip column, an
+# optional annotator column and one 1-5 rating column per emotion (the short
+# names of FilmClipsDetails.xlsx). The Excel file is parsed once into columnar
+# arrays cached under CACHE_DIR by the SHA-256 of the file and the layout:
+#   clips          str     (C,)        clip names, first-appearance order
+#   offsets        int64   (C + 1,)    ratings of clip c are rows offsets[c]:offsets[c + 1]
+#   annotators     str     (A,)        annotator ids
+#   annotator_idx  int32   (N,)        annotator of each row, -1 without an annotator column
+#   ratings        float32 (N, 16)     EMOTION_KEYS order, NaN for blank or out-of-range cells
+# ClipDistributions holds the per-clip statistics computed from them with
+# grouped array operations: valid counts, mean, sample std, quantiles and
+# rating histograms over 1-5, all per emotion.
+
+ANNOTATIONS_FILE = "EmoStimFiles/Annotated99Clips.xlsx"
+CACHE_DIR = ".cache/annotations"
+CACHE_VERSION = 1
+ANNOTATIONS_SHEET = 0
+CLIP_COLUMN = "clip_name"
+ANNOTATOR_COLUMN = "annotator"
+RATING_MIN, RATING_MAX = 1, 5
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Below this spread (rating points) annotators are treated as agreeing to within
+# half a point, so normalized errors of unanimous clips stay finite
+MIN_SPREAD = 0.5
+
+
+class Annotations:
+    def __init__(self, clips, offsets, annotators, annotator_idx, ratings):
+        self.clips = [str(clip) for clip in clips]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.annotators = [str(annotator) for annotator in annotators]
+        self.annotator_idx = np.asarray(annotator_idx, dtype=np.int32)
+        self.ratings = np.asarray(ratings, dtype=np.float32).reshape(len(self.annotator_idx), NUM_EMOTIONS)
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def save(self, path):
+        np.savez(
+            path,
+            clips=np.array(self.clips, dtype=str),
+            offsets=self.offsets,
+            annotators=np.array(self.annotators, dtype=str),
+            annotator_idx=self.annotator_idx,
+            ratings=self.ratings,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["clips"], data["offsets"], data["annotators"], data["annotator_idx"], data["ratings"])
+
+    def distributions(self, quantiles=QUANTILES):
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        n_clips = len(self.clips)
+        sizes = np.diff(self.offsets)
+        row_clip = np.repeat(np.arange(n_clips), sizes)
+        valid = ~np.isnan(self.ratings)
+        values = np.where(valid, self.ratings, 0.0).astype(np.float64)
+
+        counts = np.zeros((n_clips, NUM_EMOTIONS), dtype=np.int64)
+        sums = np.zeros((n_clips, NUM_EMOTIONS))
+        squares = np.zeros((n_clips, NUM_EMOTIONS))
+        nonempty = sizes > 0
+        if len(self):
+            starts = self.offsets[:-1][nonempty]
+            counts[nonempty] = np.add.reduceat(valid, starts, axis=0)
+            sums[nonempty] = np.add.reduceat(values, starts, axis=0)
+            squares[nonempty] = np.add.reduceat(values * values, starts, axis=0)
+        mean = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+        # Sample variance from the centered sum of squares, NaN below two ratings
+        var = np.divide(squares - counts * np.nan_to_num(mean) ** 2, counts - 1,
+                        out=np.full(sums.shape, np.nan), where=counts > 1)
+        std = np.sqrt(np.maximum(var, 0.0))
+
+        # One sort of all columns: each clip's ratings are shifted into their own
+        # band (blank cells sort last within it), so clip c still occupies rows
+        # offsets[c]:offsets[c + 1] and its valid ratings come first
+        band = RATING_MAX + 2
+        keyed = np.sort(row_clip[:, None] * band + np.where(valid, values, RATING_MAX + 1), axis=0)
+        ordered = keyed - row_clip[:, None] * band
+        # Linear interpolation between order statistics, as np.quantile
+        position = quantiles[None, :, None] * np.maximum(counts[:, None, :] - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, np.maximum(counts[:, None, :] - 1, 0))
+        base = self.offsets[:-1, None, None]
+        columns = np.arange(NUM_EMOTIONS)[None, None, :]
+        if len(self):
+            lower = ordered[np.minimum(base + low, len(self) - 1), columns]
+            upper = ordered[np.minimum(base + high, len(self) - 1), columns]
+            quantile_values = np.where(counts[:, None, :] > 0, lower + (position - low) * (upper - lower), np.nan)
+        else:
+            quantile_values = np.full((n_clips, len(quantiles), NUM_EMOTIONS), np.nan)
+
+        # Histogram of the ratings rounded to whole points: one bincount over
+        # (clip, rating, emotion) cells
+        bins = RATING_MAX - RATING_MIN + 1
+        rating_bin = np.clip(np.rint(values).astype(np.int64) - RATING_MIN, 0, bins - 1)
+        cell = (row_clip[:, None] * bins + rating_bin) * NUM_EMOTIONS + np.arange(NUM_EMOTIONS)
+        histograms = np.bincount(cell[valid], minlength=n_clips * bins * NUM_EMOTIONS)
+        histograms = histograms.reshape(n_clips, bins, NUM_EMOTIONS)
+
+        return ClipDistributions(self.clips, counts, mean, std, quantiles, quantile_values, histograms)
+
+
+class ClipDistributions:
+    def __init__(self, clips, counts, mean, std, quantile_levels, quantiles, histograms):
+        self.clips = [str(clip) for clip in clips]
+        n_clips = len(self.clips)
+        self.counts = np.asarray(counts, dtype=np.int64).reshape(n_clips, NUM_EMOTIONS)
+        self.mean = np.asarray(mean, dtype=np.float64).reshape(n_clips, NUM_EMOTIONS)
+        self.std = np.asarray(std, dtype=np.float64).reshape(n_clips, NUM_EMOTIONS)
+        self.quantile_levels = np.asarray(quantile_levels, dtype=np.float64)
+        self.quantiles = np.asarray(quantiles, dtype=np.float64).reshape(n_clips, len(self.quantile_levels), NUM_EMOTIONS)
+        self.histograms = np.asarray(histograms, dtype=np.int64).reshape(n_clips, -1, NUM_EMOTIONS)
+        self.index = {clip: i for i, clip in enumerate(self.clips)}
+
+    def __len__(self):
+        return len(self.clips)
+
+    def select(self, clips):
+        # Distributions of the given clips (names or video paths) in that order;
+        # clips without ratings get zero counts and NaN statistics
+        rows = np.array([self.index.get(clip_name(clip), -1) for clip in clips], dtype=np.int64)
+        found = rows >= 0
+        rows = np.where(found, rows, 0)
+
+        def take(values, fill):
+            if not len(self):
+                return np.full((len(rows), *values.shape[1:]), fill, dtype=values.dtype)
+            mask = found.reshape(-1, *([1] * (values.ndim - 1)))
+            return np.where(mask, values[rows], fill).astype(values.dtype)
+
+        return ClipDistributions(
+            [clip_name(clip) for clip in clips],
+            take(self.counts, 0), take(self.mean, np.nan), take(self.std, np.nan),
+            self.quantile_levels, take(self.quantiles, np.nan), take(self.histograms, 0),
+        )
+
+    def spread(self, clips):
+        # (clips, 16) inter-annotator std aligned to clips, NaN where unknown
+        return self.select(clips).std
+
+    def save(self, path):
+        np.savez(
+            path,
+            clips=np.array(self.clips, dtype=str),
+            counts=self.counts,
+            mean=self.mean,
+            std=self.std,
+            quantile_levels=self.quantile_levels,
+            quantiles=self.quantiles,
+            histograms=self.histograms,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["clips"], data["counts"], data["mean"], data["std"],
+                       data["quantile_levels"], data["quantiles"], data["histograms"])
+
+    def as_dict(self):
+        def by_emotion(values):
+            return {emotion: (None if np.isnan(v) else float(v)) for emotion, v in zip(EMOTION_KEYS, values)}
+
+        return {
+            clip: {
+                "count": dict(zip(EMOTION_KEYS, (int(n) for n in self.counts[i]))),
+                "mean": by_emotion(self.mean[i]),
+                "std": by_emotion(self.std[i]),
+                "quantiles": {f"{level:g}": by_emotion(row) for level, row in zip(self.quantile_levels, self.quantiles[i])},
+                "histogram": {emotion: [int(n) for n in self.histograms[i, :, e]] for e, emotion in enumerate(EMOTION_KEYS)},
+            }
+            for i, clip in enumerate(self.clips)
+        }
+
+
+def build_from_excel(path, sheet_name=ANNOTATIONS_SHEET, clip_column=CLIP_COLUMN, annotator_column=ANNOTATOR_COLUMN):
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    missing = [column for column in [clip_column, *SHORT_EMOTION_NAMES] if column not in df.columns]
+    if missing:
+        raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+    df = df[df[clip_column].notna()]
+
+    ratings = df[SHORT_EMOTION_NAMES].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32, copy=True)
+    ratings[(ratings < RATING_MIN) | (ratings > RATING_MAX)] = np.nan
+    rated = ~np.isnan(ratings).all(axis=1)
+    ratings = ratings[rated]
+    row_clips = np.array([clip_name(clip) for clip in df[clip_column].astype(str)], dtype=str)[rated]
+    if annotator_column and annotator_column in df.columns:
+        annotators, annotator_idx = np.unique(df[annotator_column].astype(str).to_numpy()[rated], return_inverse=True)
+    else:
+        annotators, annotator_idx = np.array([], dtype=str), np.full(len(ratings), -1)
+
+    # Rows grouped by clip (stable, so annotator order is kept within a clip),
+    # clips in first-appearance order
+    unique, first, inverse = np.unique(row_clips, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    groups = rank[inverse]
+    rows = np.argsort(groups, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(groups, minlength=len(unique)))])
+    return Annotations(unique[order], offsets, annotators, annotator_idx[rows], ratings[rows])
+
+
+def load_annotations(path=ANNOTATIONS_FILE, cache_dir=CACHE_DIR, sheet_name=ANNOTATIONS_SHEET,
+                     clip_column=CLIP_COLUMN, annotator_column=ANNOTATOR_COLUMN):
+    cache_path = None
+    if cache_dir:
+        layout = hashlib.sha256(json.dumps([sheet_name, clip_column, annotator_column]).encode()).hexdigest()[:12]
+        cache_path = os.path.join(cache_dir, f"v{CACHE_VERSION}-{file_sha256(path)}-{layout}.npz")
+        if os.path.exists(cache_path):
+            return Annotations.load(cache_path)
+
+    annotations = build_from_excel(path, sheet_name, clip_column, annotator_column)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp.npz"
+        annotations.save(tmp_path)
+        os.replace(tmp_path, cache_path)
+    return annotations
+
+
+def load_distributions(path=ANNOTATIONS_FILE, cache_dir=CACHE_DIR, quantiles=QUANTILES):
+    # Distributions from saved statistics (.npz) or the annotations spreadsheet
+    if path.endswith(".npz"):
+        return ClipDistributions.load(path)
+    return load_annotations(path, cache_dir).distributions(quantiles)
+
+
+def sheet_arg(value):
+    # Sheet names that are all digits select a sheet by position, as in pandas
+    return int(value) if value.isdigit() else value
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-clip rating distributions from the per-annotator spreadsheet")
+    parser.add_argument("--src", type=str, default=ANNOTATIONS_FILE, help="Annotated99Clips.xlsx")
+    parser.add_argument("--out", type=str, help="Write the distributions to this .npz or .json file")
+    parser.add_argument("--sheet", type=sheet_arg, default=ANNOTATIONS_SHEET,
+                        help="Name or 0-based position of the sheet holding one row per (annotator, clip) (default: 0)")
+    parser.add_argument("--clip-column", type=str, default=CLIP_COLUMN, help="Column with the clip names")
+    parser.add_argument("--annotator-column", type=str, default=ANNOTATOR_COLUMN,
+                        help="Column with the annotator ids (optional in the sheet)")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=list(QUANTILES), help="Quantile levels to compute")
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR, help="Directory for the cached ratings")
+    instrument.add_trace_argument(parser)
+
+    args = parser.parse_args(argv)
+    with instrument.tracing(args.trace, "annotations"):
+        with instrument.stage("load") as stage:
+            annotations = load_annotations(args.src, args.cache_dir, args.sheet, args.clip_column, args.annotator_column)
+            stage.count(len(annotations))
+        with instrument.stage("distributions") as stage:
+            distributions = annotations.distributions(args.quantiles)
+            stage.count(len(distributions))
+        print(f"{len(annotations)} ratings by {len(annotations.annotators) or 'unknown'} annotators "
+              f"for {len(distributions)} clips from {args.src}")
+        if args.out:
+            with instrument.stage("write"):
+                if args.out.endswith(".json"):
+                    with open(args.out, "w") as f:
+                        json.dump(distributions.as_dict(), f, indent=2)
+                else:
+                    distributions.save(args.out)
+            print(f"Saved rating distributions to {args.out}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from .constants import EMOTION_KEYS, NUM_EMOTIONS, PROMPT_TEMPLATES, EMOTION_LIST_TEXT
+from .emotion_parser import parse_emotion_string
+from .prediction_reader import iter_predictions
+
+# Scaling benchmark for the parser and the scoring/evaluation entry points.
+# Synthetic predictions with the real schema (the 20 real prompts, "Label: x.y"
+# responses) are generated at each scale, where 1x is the size of the sample
+# vila_results.json (5 models x 28 videos x 20 templates); scaling multiplies the
+# number of videos. A fraction of the responses is malformed in the ways real
+# model output goes wrong. Every entry point runs in a fresh process, timed with
+# its own wall time, CPU time and peak RSS (from wait4), and the best of --repeat
+# runs is kept. Results can be saved as a baseline, and later runs flag entries
+# that got slower or bigger than the baseline by more than --tolerance.
+#
+# The "startup" entry checks that importing the light commands stays cheap and
+# does not pull in pandas, scikit-learn or matplotlib.
+
+WORK_DIR = ".cache/bench"
+BASELINE = "benchmarks/baseline.json"
+SCALES = [1, 10, 100, 1000]
+MODELS = 5
+VIDEOS = 28
+TEMPLATES = len(PROMPT_TEMPLATES)
+MALFORMED_RATE = 0.05
+TOLERANCE = 0.25
+# Differences below this are noise, whatever the ratio
+MIN_DELTA_S = 0.05
+MIN_DELTA_MB = 8.0
+STARTUP_LIMIT_S = 0.5
+HEAVY_MODULES = ["pandas", "sklearn", "matplotlib", "seaborn"]
+ENTRIES = ["startup", "parse", "scores", "evaluate"]
+MALFORMED_KINDS = ["truncated", "empty", "prose", "bad_score", "chatter"]
+
+# Pre-formatted "Label: x.y" pairs for scores 1.0 ... 5.0 in steps of 0.1
+_PAIRS = [[f"{key}: {tenths / 10:.1f}" for tenths in range(10, 51)] for key in EMOTION_KEYS]
+
+
+def _malformed(kind, pairs, rng):
+    if kind == "truncated":
+        return ", ".join(pairs[:rng.integers(1, NUM_EMOTIONS)])
+    if kind == "empty":
+        return ""
+    if kind == "prose":
+        return "I'm sorry, but I can't determine the emotional content of this video."
+    if kind == "bad_score":
+        pairs = list(pairs)
+        pairs[rng.integers(NUM_EMOTIONS)] = f"{EMOTION_KEYS[rng.integers(NUM_EMOTIONS)]}: N/A"
+        return ", ".join(pairs)
+    return "Sure! Here are the ratings for the video:\n\n" + "\n".join(f"- **{pair}**" for pair in pairs)
+
+
+def workload_paths(work_dir, n_models, n_videos, n_templates, malformed_rate, seed, fmt):
+    stem = f"{n_models}x{n_videos}x{n_templates}-m{malformed_rate:g}-s{seed}"
+    return os.path.join(work_dir, f"pred-{stem}.{fmt}"), os.path.join(work_dir, f"gt-{stem}.json")
+
+
+def generate(pred_path, gt_path, n_models, n_videos, n_templates, malformed_rate=MALFORMED_RATE, seed=0):
+    # Writes a predictions file and a matching VILA test JSON, streaming, so
+    # memory stays flat at any scale. Returns the number of prediction records.
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(pred_path)), exist_ok=True)
+    videos = [f"bench_clip_{v:07d}.mp4" for v in range(n_videos)]
+    # Ground truth means and each model's noisy ratings, in tenths
+    gt_tenths = rng.integers(10, 51, size=(n_videos, NUM_EMOTIONS))
+    prompts = [json.dumps(PROMPT_TEMPLATES[t % len(PROMPT_TEMPLATES)].format(EMOTION_LIST_TEXT))
+               for t in range(n_templates)]
+    models = [f"bench-model-{m}" for m in range(n_models)]
+    jsonl = pred_path.endswith(".jsonl")
+
+    tmp_path = pred_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        if not jsonl:
+            f.write("{")
+        for m, model in enumerate(models):
+            if not jsonl:
+                f.write(("," if m else "") + f"\n  {json.dumps(model)}: {{")
+            for v, video in enumerate(videos):
+                noise = rng.normal(0, 8, size=(n_templates, NUM_EMOTIONS))
+                tenths = np.clip(np.rint(gt_tenths[v] + noise), 10, 50).astype(int) - 10
+                bad = rng.random(n_templates) < malformed_rate
+                kinds = rng.integers(len(MALFORMED_KINDS), size=n_templates)
+                entries = []
+                for t in range(n_templates):
+                    pairs = [_PAIRS[e][s] for e, s in enumerate(tenths[t])]
+                    text = _malformed(MALFORMED_KINDS[kinds[t]], pairs, rng) if bad[t] else ", ".join(pairs)
+                    entries.append((prompts[t], json.dumps(text)))
+                if jsonl:
+                    head = f'{{"model": {json.dumps(model)}, "video": {json.dumps(video)}, '
+                    f.writelines(f'{head}"prompt": {p}, "prediction": {x}}}\n' for p, x in entries)
+                else:
+                    body = ", ".join(f'{{"prompt": {p}, "prediction": {x}}}' for p, x in entries)
+                    f.write(("," if v else "") + f"\n    {json.dumps(video)}: [{body}]")
+            if not jsonl:
+                f.write("\n  }")
+        if not jsonl:
+            f.write("\n}\n")
+    os.replace(tmp_path, pred_path)
+
+    with open(gt_path, "w") as f:
+        json.dump([
+            {
+                "video": f"videos/{video}",
+                "conversations": [
+                    {"from": "human", "value": json.loads(prompts[0])},
+                    {"from": "gpt", "value": ", ".join(_PAIRS[e][s - 10] for e, s in enumerate(gt_tenths[v]))},
+                ],
+            }
+            for v, video in enumerate(videos)
+        ], f)
+    return n_models * n_videos * n_templates
+
+
+def parse_file(pred_path):
+    # The "parse" entry: parse_emotion_string over every streamed response
+    n = 0
+    for _, _, entry in iter_predictions(pred_path):
+        parse_emotion_string(entry["prediction"])
+        n += 1
+    return n
+
+
+def measure(cmd, repeat=1):
+    # Fastest of `repeat` runs of cmd (wall and CPU time of that run) and the
+    # largest peak RSS of all runs; raises if the command fails
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryFile() as stderr:
+            start = time.perf_counter()
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr)
+            # wait4 gives the resource usage of this child alone
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - start
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            if proc.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode("utf-8", "replace")
+                raise RuntimeError(f"{' '.join(cmd)} failed with exit code {proc.returncode}:\n{message}")
+        # ru_maxrss is in kilobytes on Linux
+        runs.append({"wall_s": wall, "cpu_s": usage.ru_utime + usage.ru_stime, "peak_rss_mb": usage.ru_maxrss / 1024})
+    best = min(runs, key=lambda run: run["wall_s"])
+    return {**best, "peak_rss_mb": max(run["peak_rss_mb"] for run in runs)}
+
+
+def entry_command(entry, pred_path, gt_path, out_dir, models):
+    python = [sys.executable, "-m", "emostim"]
+    if entry == "parse":
+        return [sys.executable, "-c", "import sys; from emostim.benchmark import parse_file; parse_file(sys.argv[1])",
+                pred_path]
+    if entry == "scores":
+        return python + ["scores", "--pred", pred_path, "--out", os.path.join(out_dir, "scores.json"),
+                         "--model", *models]
+    if entry == "evaluate":
+        return python + ["evaluate", "--pred", pred_path, "--gt", gt_path, "--out", os.path.join(out_dir, "eval.json"),
+                         "--metric", "mae", "mse", "--seed", "0"]
+    raise ValueError(f"Unknown entry: {entry}")
+
+
+def check_startup(repeat=3):
+    # Start-up of a light command, and the heavy modules its imports pull in
+    result = measure([sys.executable, "-m", "emostim", "scores", "-h"], repeat)
+    probe = ("import sys, emostim.get_scores, emostim.compute_vila_error, emostim.run_inference, emostim.score_index; "
+             f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.split()
+    result["heavy_imports"] = loaded
+    return result
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Entries slower or bigger than the baseline beyond tolerance and the noise floor
+    regressions = []
+    for entry, by_scale in results.items():
+        for scale, current in by_scale.items():
+            previous = baseline.get(entry, {}).get(scale)
+            if previous is None:
+                continue
+            for field, floor in [("wall_s", MIN_DELTA_S), ("peak_rss_mb", MIN_DELTA_MB)]:
+                ratio = current[field] / previous[field] if previous[field] else float("inf")
+                if ratio > 1 + tolerance and current[field] - previous[field] > floor:
+                    regressions.append((entry, scale, field, previous[field], current[field], ratio))
+    return regressions
+
+
+def run(args):
+    results = {}
+    failures = []
+
+    if "startup" in args.entries:
+        startup = check_startup(max(args.repeat, 3))
+        results["startup"] = {"-": startup}
+        if startup["wall_s"] > STARTUP_LIMIT_S:
+            failures.append(f"`emostim scores -h` took {startup['wall_s']:.3f} s (limit {STARTUP_LIMIT_S} s)")
+        if startup["heavy_imports"]:
+            failures.append(f"light commands import {', '.join(startup['heavy_imports'])} at start-up")
+
+    models = [f"bench-model-{m}" for m in range(args.models)]
+    for scale in args.scales:
+        n_videos = args.videos * scale
+        pred_path, gt_path = workload_paths(args.work_dir, args.models, n_videos, args.templates,
+                                            args.malformed_rate, args.seed, args.format)
+        if os.path.exists(pred_path) and os.path.exists(gt_path):
+            n_records = args.models * n_videos * args.templates
+        else:
+            start = time.perf_counter()
+            n_records = generate(pred_path, gt_path, args.models, n_videos, args.templates,
+                                 args.malformed_rate, args.seed)
+            print(f"Generated {n_records:,} records at {scale}x ({os.path.getsize(pred_path) / 2 ** 20:,.0f} MB) "
+                  f"in {time.perf_counter() - start:.1f} s")
+        if "evaluate" in args.entries:
+            # Build the cached ground-truth index first, so it is not timed
+            from .ground_truth import load_ground_truth
+            load_ground_truth(gt_path)
+
+        for entry in args.entries:
+            if entry == "startup":
+                continue
+            cmd = entry_command(entry, pred_path, gt_path, args.work_dir, models)
+            result = measure(cmd, args.repeat)
+            result["records"] = n_records
+            result["records_per_s"] = n_records / result["wall_s"]
+            results.setdefault(entry, {})[f"{scale}x"] = result
+            print(f"{entry:>9} {scale:>5}x {n_records:>12,} records {result['wall_s']:9.3f} s "
+                  f"{result['records_per_s']:>12,.0f} rec/s {result['peak_rss_mb']:8.1f} MB")
+
+        if not args.keep:
+            os.remove(pred_path)
+            os.remove(gt_path)
+
+    if "startup" in results:
+        startup = results["startup"]["-"]
+        print(f"  startup {startup['wall_s']:.3f} s, {startup['peak_rss_mb']:.1f} MB, "
+              f"heavy imports: {', '.join(startup['heavy_imports']) or 'none'}")
+
+    report = {"machine": machine_info(), "config": {
+        "models": args.models, "videos": args.videos, "templates": args.templates,
+        "malformed_rate": args.malformed_rate, "seed": args.seed, "format": args.format,
+    }, "results": results}
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved benchmark results to {args.out}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != report["machine"]:
+            print(f"Warning: baseline was recorded on a different machine: {baseline.get('machine')}")
+        if baseline.get("config") != report["config"]:
+            print(f"Warning: baseline used a different workload: {baseline.get('config')}")
+        for entry, scale, field, previous, current, ratio in compare(results, baseline["results"], args.tolerance):
+            failures.append(f"{entry} {scale} {field}: {previous:.3f} -> {current:.3f} ({ratio:.2f}x baseline)")
+        print(f"Compared with baseline {args.baseline}")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Time parsing, scoring and evaluation on synthetic predictions")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES,
+                        help="Workload sizes as multiples of the sample data (1x = 5 models x 28 videos x 20 templates)")
+    parser.add_argument("--entries", type=str, nargs="+", choices=ENTRIES, default=ENTRIES, help="Entry points to time")
+    parser.add_argument("--models", type=int, default=MODELS, help="Models in the synthetic predictions")
+    parser.add_argument("--videos", type=int, default=VIDEOS, help="Videos at 1x; scales multiply this")
+    parser.add_argument("--templates", type=int, default=TEMPLATES, help="Responses per video and model")
+    parser.add_argument("--malformed-rate", type=float, default=MALFORMED_RATE,
+                        help="Fraction of responses that are truncated, empty, prose or otherwise malformed")
+    parser.add_argument("--format", type=str, choices=["json", "jsonl"], default="json", help="Predictions file format")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per entry point; the fastest is kept")
+    parser.add_argument("--work-dir", type=str, default=WORK_DIR, help="Directory for generated workloads and outputs")
+    parser.add_argument("--keep", action="store_true", help="Keep generated workloads for later runs")
+    parser.add_argument("--out", type=str, help="Save the results JSON here")
+    parser.add_argument("--baseline", type=str, default=BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Relative slowdown or memory growth over the baseline that counts as a regression")
+
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
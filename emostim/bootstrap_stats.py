@@ -0,0 +1,129 @@
+import numpy as np
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS
+
+# Bootstrap statistics over clips for compute_vila_error.py --bootstrap. A
+# resample is a vector of clip multiplicities, so a block of resamples is a
+# (resamples, clips) weight matrix W, and the resampled means of every model and
+# emotion at once are W @ errors / W @ valid, with errors stacked as a
+# (clips, models * 16) matrix (a model only averages over the clips it has valid
+# predictions for). Paired tests use the same W on per-clip overall error
+# differences of each model pair, restricted to clips valid for both. Blocks of
+# resamples are spread over a process pool; each block has its own seed spawned
+# from the run's seed, so results do not depend on the number of workers.
+
+N_RESAMPLES = 2000
+RANDOM_DRAWS = 1000
+CONFIDENCE = 0.95
+# Upper bound on resamples x clips per block, to bound memory
+BLOCK_CELLS = 1 << 20
+
+_shared = {}
+
+
+def _init_worker(errors, valid, pair_diffs, pair_valid):
+    _shared.update(errors=errors, valid=valid, pair_diffs=pair_diffs, pair_valid=pair_valid)
+
+
+def resample_weights(n_clips, n_resamples, rng):
+    # (n_resamples, n_clips) multiplicities of each clip in each resample
+    picks = rng.integers(0, n_clips, size=(n_resamples, n_clips))
+    picks += np.arange(n_resamples)[:, None] * n_clips
+    return np.bincount(picks.ravel(), minlength=n_resamples * n_clips).reshape(n_resamples, n_clips).astype(np.float64)
+
+
+def _resample_block(task):
+    n_resamples, seed = task
+    errors, valid = _shared["errors"], _shared["valid"]
+    weights = resample_weights(len(errors), n_resamples, np.random.default_rng(seed))
+    n_models = valid.shape[1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sums = (weights @ errors).reshape(n_resamples, n_models, NUM_EMOTIONS)
+        means = sums / (weights @ valid)[..., None]
+        pair_means = (weights @ _shared["pair_diffs"]) / (weights @ _shared["pair_valid"])
+    return means, pair_means
+
+
+def interval(samples, point, confidence=CONFIDENCE):
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.nanquantile(samples, [alpha, 1.0 - alpha], axis=0)
+    return {"mean": float(point), "low": float(low), "high": float(high)}
+
+
+def summarize_means(point, samples, confidence=CONFIDENCE):
+    # point (16,) and samples (B, 16) -> overall and per-emotion intervals
+    return {
+        "overall": interval(samples.mean(axis=1), point.mean(), confidence),
+        "per_emotion": {
+            emotion: interval(samples[:, e], point[e], confidence)
+            for e, emotion in enumerate(EMOTION_KEYS)
+        },
+    }
+
+
+def random_baseline(gt, err_fn, n_draws, rng, confidence=CONFIDENCE):
+    # Uniform 1-5 guesses, n_draws independent draws over all clips
+    means = np.empty((n_draws, gt.shape[1]))
+    block = max(1, BLOCK_CELLS // max(gt.size, 1))
+    for start in range(0, n_draws, block):
+        stop = min(start + block, n_draws)
+        guesses = rng.uniform(1.0, 5.0, size=(stop - start,) + gt.shape)
+        means[start:stop] = err_fn(guesses - gt).mean(axis=1)
+    result = {"draws": n_draws, **summarize_means(means.mean(axis=0), means, confidence)}
+    result["overall"]["std"] = float(means.mean(axis=1).std())
+    return result
+
+
+def bootstrap_errors(model_errors, valid, gt, err_fn, n_resamples=N_RESAMPLES, seed=None,
+                     confidence=CONFIDENCE, workers=None, reference=None, random_draws=RANDOM_DRAWS):
+    # model_errors: {model: (clips, 16) errors}; valid: {model: (clips,) bool}
+    models = [model for model in model_errors if valid[model].any()]
+    if reference is not None:
+        pairs = [(reference, model) for model in models if model != reference]
+    else:
+        pairs = list(combinations(models, 2))
+    pairs = [(a, b) for a, b in pairs if (valid[a] & valid[b]).any()]
+
+    errors = np.stack([np.where(valid[model][:, None], model_errors[model], 0.0) for model in models], axis=1)
+    valid_matrix = np.stack([valid[model] for model in models], axis=1).astype(np.float64)
+    pair_valid = np.zeros((len(gt), len(pairs)))
+    pair_diffs = np.zeros((len(gt), len(pairs)))
+    for p, (a, b) in enumerate(pairs):
+        pair_valid[:, p] = valid[a] & valid[b]
+        pair_diffs[:, p] = np.where(pair_valid[:, p] > 0, (model_errors[a] - model_errors[b]).mean(axis=1), 0.0)
+
+    block = max(1, BLOCK_CELLS // max(len(gt), 1))
+    sizes = [min(block, n_resamples - start) for start in range(0, n_resamples, block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes) + 1)
+    shared = (errors.reshape(len(gt), -1), valid_matrix, pair_diffs, pair_valid)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=shared) as pool:
+        blocks = list(pool.map(_resample_block, zip(sizes, seeds[:-1])))
+    means = np.concatenate([block_means for block_means, _ in blocks])
+    pair_means = np.concatenate([block_pairs for _, block_pairs in blocks])
+
+    model_results = {}
+    for m, model in enumerate(models):
+        point = model_errors[model][valid[model]].mean(axis=0)
+        model_results[model] = {"n_clips": int(valid[model].sum()), **summarize_means(point, means[:, m], confidence)}
+
+    pair_results = []
+    for p, (a, b) in enumerate(pairs):
+        both = pair_valid[:, p] > 0
+        # Positive differences mean the first model has the larger error
+        point = float(pair_diffs[both, p].mean())
+        samples = pair_means[:, p][np.isfinite(pair_means[:, p])]
+        result = {"a": a, "b": b, "n_clips": int(both.sum()), **interval(samples, point, confidence)}
+        # Two-sided p-value of "no difference", from the bootstrap distribution
+        # shifted to be centred on zero
+        result["p_value"] = float(np.mean(np.abs(samples - point) >= abs(point)))
+        pair_results.append(result)
+
+    return {
+        "resamples": n_resamples,
+        "confidence": confidence,
+        "seed": seed,
+        "models": model_results,
+        "random_baseline": random_baseline(gt, err_fn, random_draws, np.random.default_rng(seeds[-1]), confidence),
+        "paired": pair_results,
+    }
@@ -0,0 +1,47 @@
+import sys
+import argparse
+import importlib
+
+# Single entry point for all tools: `emostim <command> [options]`. Each command
+# maps to a module exposing cli(argv); the module is imported only when its
+# command runs, so light commands such as `scores` never load pandas,
+# scikit-learn or matplotlib.
+
+COMMANDS = {
+    "convert": ("convert_to_vila_ds", "Build VILA train/test datasets from the EmoStim spreadsheets"),
+    "prepare": ("prepare_for_inference", "Build the inference manifest for a directory of videos"),
+    "infer": ("run_inference", "Run a manifest against an OpenAI-compatible chat endpoint"),
+    "stub-server": ("inference_stub_server", "Serve random ratings for testing `infer`"),
+    "adaptive": ("adaptive_sampling", "Replay adaptive template stopping on full predictions"),
+    "scores": ("get_scores", "Average per-video emotion scores of one or more models"),
+    "index": ("score_index", "Query a per-video emotion score index"),
+    "timeline": ("timeline", "Print per-segment emotion timelines of windowed predictions"),
+    "evaluate": ("compute_vila_error", "Compute MSE/MAE of predictions against the ground truth"),
+    "plot": ("plot", "Render the model comparison figures"),
+    "store": ("results_store", "Compile predictions into a columnar results store"),
+    "ground-truth": ("ground_truth", "Build or refresh the cached ground-truth index"),
+    "annotations": ("annotations", "Build per-clip rating distributions from the per-annotator ratings"),
+    "compact": ("compact_dataset", "Expand a compact dataset into VILA JSON"),
+    "shards": ("dataset_io", "Print one worker's slice of a sharded dataset"),
+    "probe": ("video_probe", "Probe videos and refresh the probe index"),
+    "frames": ("frame_cache", "Decode and cache sampled frames for a directory of videos"),
+    "parse-bench": ("emotion_parser", "Micro-benchmark the emotion response parser"),
+    "bench": ("benchmark", "Time parsing, scoring and evaluation on synthetic predictions"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="emostim",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {name:<14}{text}" for name, (_, text) in COMMANDS.items())
+               + "\n\nRun `emostim <command> -h` for the options of a command.",
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(f"{__package__}.{COMMANDS[args.command][0]}")
+    # argparse takes the program name of the subcommand's usage line from argv[0]
+    sys.argv = [f"emostim {args.command}", *args.args]
+    return module.cli(args.args)
@@ -0,0 +1,107 @@
+import argparse
+import numpy as np
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS
+from .dataset_io import write_json_array
+
+# Template-factored dataset: every prompt and every clip score vector is stored
+# once, plus a (record, 2) index of (clip row, prompt row) pairs. Records are
+# expanded into the VILA {"video", "conversations"} shape only when accessed.
+# Saved as a single .npz:
+#   videos  str     (C,)      video path per clip
+#   prompts str     (T,)      fully formatted prompts
+#   scores  float64 (C, 16)   ground-truth scores (absent for inference sets)
+#   frames  str     (C,)      cached frame array per clip (optional, see frame_cache.py)
+#   index   int32   (N, 2)    (clip row, prompt row) per record
+
+
+def format_response(scores):
+    return ", ".join([
+        f"{label}: {round(float(score), 1)}"
+        for label, score in zip(EMOTION_KEYS, scores)
+    ])
+
+
+class CompactDataset:
+    def __init__(self, videos, prompts, scores=None, index=None, frames=None):
+        self.videos = np.asarray(videos, dtype=str)
+        self.prompts = np.asarray(prompts, dtype=str)
+        self.scores = None if scores is None else np.asarray(scores, dtype=np.float64).reshape(-1, NUM_EMOTIONS)
+        self.frames = None if frames is None else np.asarray(frames, dtype=str)
+        if index is None:
+            # Every clip with every prompt, clip-major like the JSON writer
+            clip_rows, prompt_rows = np.meshgrid(
+                np.arange(len(self.videos)), np.arange(len(self.prompts)), indexing="ij"
+            )
+            index = np.stack([clip_rows.ravel(), prompt_rows.ravel()], axis=1)
+        self.index = np.asarray(index, dtype=np.int32).reshape(-1, 2)
+        self._responses = {}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            scores = data["scores"] if "scores" in data else None
+            frames = data["frames"] if "frames" in data else None
+            return cls(data["videos"], data["prompts"], scores, data["index"], frames)
+
+    def save(self, path):
+        arrays = {"videos": self.videos, "prompts": self.prompts, "index": self.index}
+        if self.scores is not None:
+            arrays["scores"] = self.scores
+        if self.frames is not None:
+            arrays["frames"] = self.frames
+        np.savez_compressed(path, **arrays)
+
+    def __len__(self):
+        return len(self.index)
+
+    def response(self, clip_row):
+        if self.scores is None:
+            return ""
+        if clip_row not in self._responses:
+            self._responses[clip_row] = format_response(self.scores[clip_row])
+        return self._responses[clip_row]
+
+    def __getitem__(self, i):
+        clip_row, prompt_row = (int(x) for x in self.index[i])
+        entry = {
+            "video": str(self.videos[clip_row]),
+            "conversations": [
+                {"from": "human", "value": str(self.prompts[prompt_row])},
+                {"from": "gpt", "value": self.response(clip_row)}
+            ]
+        }
+        if self.frames is not None and self.frames[clip_row]:
+            entry["frames"] = str(self.frames[clip_row])
+        return entry
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def select_clips(self, clip_rows, ordered=False):
+        # Records of the given clips, in their original order or, with
+        # ordered=True, grouped in the order the clips are given
+        position = np.full(len(self.videos), -1, dtype=np.int64)
+        position[np.asarray(clip_rows, dtype=np.int64)] = np.arange(len(clip_rows))
+        index = self.index[position[self.index[:, 0]] >= 0]
+        if ordered:
+            index = index[np.argsort(position[index[:, 0]], kind="stable")]
+        return CompactDataset(self.videos, self.prompts, self.scores, index, self.frames)
+
+    def export_json(self, path):
+        return write_json_array(path, self)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Expand a compact dataset into VILA JSON")
+    parser.add_argument("--src", type=str, required=True, help="Path to compact dataset .npz")
+    parser.add_argument("--out", type=str, required=True, help="Path to save VILA JSON")
+
+    args = parser.parse_args(argv)
+    dataset = CompactDataset.load(args.src)
+    dataset.export_json(args.out)
+    print(f"Saved {len(dataset)} entries to {args.out}")
+
+
+if __name__ == "__main__":
+    cli()
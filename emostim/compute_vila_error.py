@@ -0,0 +1,378 @@
+import os
+import json
+import time
+import numpy as np
+from collections import defaultdict
+import argparse
+from . import instrument
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS, parse_emotion_string
+from .ground_truth import load_ground_truth, clip_name
+from .annotations import load_distributions, ANNOTATIONS_FILE, MIN_SPREAD
+from .prediction_reader import iter_predictions, load_predictions, accumulate_scores
+from .results_store import ResultsStore, is_store
+from .eval_cache import cached_model_totals, pack_totals, CACHE_DIR
+from .bootstrap_stats import bootstrap_errors, N_RESAMPLES, RANDOM_DRAWS, CONFIDENCE
+
+WATCH_INTERVAL = 10.0
+
+def compute_error(pred, gt, metric):
+    if metric == "mse":
+        return (pred - gt) ** 2
+    elif metric == "mae":
+        return abs(pred - gt)
+    else:
+        raise ValueError(f"Unsupported metric: {metric}")
+
+# Elementwise error functions for the vectorized engine, applied to (pred - gt)
+METRIC_FNS = {
+    "mse": np.square,
+    "mae": np.abs,
+}
+
+def accumulate_predictions(records, video_index, min_emotions=NUM_EMOTIONS):
+    # Stream (model, video, entry) records into per-(model, video) score sums and
+    # per-emotion valid-sample counts, shaped (models, videos, emotions) with
+    # videos in ground-truth order. Responses with fewer than min_emotions labels
+    # are dropped entirely.
+    def key_fn(model, video):
+        v = video_index.get(clip_name(video))
+        return None if v is None else (model, v)
+
+    keys, key_sums, key_counts = accumulate_scores(records, key_fn, min_emotions)
+
+    models = list(dict.fromkeys(model for model, _ in keys))
+    model_index = {model: m for m, model in enumerate(models)}
+    m_idx = np.array([model_index[model] for model, _ in keys], dtype=np.intp)
+    v_idx = np.array([v for _, v in keys], dtype=np.intp)
+
+    shape = (len(models), len(video_index), NUM_EMOTIONS)
+    sums = np.zeros(shape, dtype=np.float64)
+    counts = np.zeros(shape, dtype=np.int64)
+    sums[m_idx, v_idx] = key_sums
+    counts[m_idx, v_idx] = key_counts
+    return models, sums, counts
+
+def accumulate_store(store, video_index, min_emotions=NUM_EMOTIONS):
+    # Same result as accumulate_predictions, computed from a compiled results store
+    video_map = np.array(
+        [video_index.get(clip_name(video), -1) for video in store.videos] + [-1],
+        dtype=np.int64,
+    )
+    record_videos = video_map[np.asarray(store.video_idx)]
+    keys = np.where(record_videos >= 0, np.asarray(store.model_idx) * len(video_index) + record_videos, -1)
+    sums, counts = store.aggregate(keys, len(store.models) * len(video_index), min_emotions)
+    shape = (len(store.models), len(video_index), NUM_EMOTIONS)
+    return list(store.models), sums.reshape(shape), counts.reshape(shape)
+
+def prediction_diffs(sums, counts, gt):
+    # Average the valid samples of each (model, video); a video only counts for
+    # a model when every emotion has at least one valid sample.
+    avg_pred = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    video_valid = (counts > 0).all(axis=-1)
+    return avg_pred - gt[None], video_valid
+
+def evaluate_arrays(models, sums, counts, gt, metrics, rng=None, spread=None):
+    diff, video_valid = prediction_diffs(sums, counts, gt)
+    n_videos = video_valid.sum(axis=1)
+    uniform = np.random.uniform if rng is None else rng.uniform
+
+    baselines = {
+        # try a baseline guess of 3
+        "baseline": np.full(gt.shape, 3.0) - gt,
+        # try a random guess
+        "random_baseline": uniform(1.0, 5.0, size=gt.shape) - gt,
+    }
+
+    final_results = {}
+    for metric in metrics:
+        err_fn = METRIC_FNS[metric]
+        err = np.where(video_valid[..., None], err_fn(diff), 0.0)
+        per_emotion = {}
+        for m, model in enumerate(models):
+            if n_videos[m]:
+                per_emotion[model] = err[m].sum(axis=0) / n_videos[m]
+        for name, baseline_diff in baselines.items():
+            if len(gt):
+                per_emotion[name] = err_fn(baseline_diff).mean(axis=0)
+
+        final_results[f"{metric}_overall"] = {
+            model: float(errors.mean()) for model, errors in per_emotion.items()
+        }
+        final_results[f"{metric}_per_emotion"] = {
+            model: {emotion: float(e) for emotion, e in zip(EMOTION_KEYS, errors)}
+            for model, errors in per_emotion.items()
+        }
+        if spread is not None:
+            final_results.update(normalized_errors(models, diff, video_valid, gt, spread, metric))
+    return final_results
+
+def normalized_errors(models, diff, video_valid, gt, spread, metric):
+    # Errors in units of the inter-annotator spread of each (clip, emotion): MAE
+    # over the std, MSE over the variance. Only clips with a known spread count.
+    err_fn = METRIC_FNS[metric]
+    scale = err_fn(np.maximum(spread, MIN_SPREAD))
+    known = ~np.isnan(spread)
+    valid = video_valid[..., None] & known[None]
+    err = np.where(valid, err_fn(diff) / np.where(known, scale, 1.0), 0.0)
+    n_valid = valid.sum(axis=1)
+    per_emotion = {}
+    for m, model in enumerate(models):
+        if n_valid[m].all():
+            per_emotion[model] = err[m].sum(axis=0) / n_valid[m]
+    if known.any(axis=0).all():
+        baseline = np.where(known, err_fn(np.full(gt.shape, 3.0) - gt) / np.where(known, scale, 1.0), 0.0)
+        per_emotion["baseline"] = baseline.sum(axis=0) / known.sum(axis=0)
+    return {
+        f"{metric}_normalized_overall": {model: float(errors.mean()) for model, errors in per_emotion.items()},
+        f"{metric}_normalized_per_emotion": {
+            model: {emotion: float(e) for emotion, e in zip(EMOTION_KEYS, errors)}
+            for model, errors in per_emotion.items()
+        },
+    }
+
+def evaluate_store(store, ground_truth, metrics, min_emotions=NUM_EMOTIONS, rng=None):
+    models, sums, counts = accumulate_store(store, ground_truth.index, min_emotions)
+    return evaluate_arrays(models, sums, counts, ground_truth.scores, metrics, rng)
+
+def accumulate_cached(pred_path, video_index, min_emotions=NUM_EMOTIONS, cache_dir=CACHE_DIR):
+    totals, parsed = cached_model_totals(pred_path, cache_dir, min_emotions)
+    print(f"Parsed {len(parsed)} new or changed models, {len(totals) - len(parsed)} from cache")
+    return pack_totals(totals, video_index)
+
+def bootstrap_arrays(models, sums, counts, gt, metrics, n_resamples=N_RESAMPLES, seed=None,
+                     confidence=CONFIDENCE, workers=None, reference=None, random_draws=RANDOM_DRAWS):
+    diff, video_valid = prediction_diffs(sums, counts, gt)
+    stats = {}
+    for metric in metrics:
+        err_fn = METRIC_FNS[metric]
+        model_errors = {model: err_fn(diff[m]) for m, model in enumerate(models)}
+        valid = {model: video_valid[m] for m, model in enumerate(models)}
+        model_errors["baseline"] = err_fn(np.full(gt.shape, 3.0) - gt)
+        valid["baseline"] = np.ones(len(gt), dtype=bool)
+        stats[f"{metric}_bootstrap"] = bootstrap_errors(
+            model_errors, valid, gt, err_fn, n_resamples, seed, confidence, workers, reference, random_draws
+        )
+    return stats
+
+def _iter_complete_lines(f):
+    # Records from complete lines only; a line still being written is left for
+    # the next poll
+    while True:
+        start = f.tell()
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            f.seek(start)
+            return
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop("model"), record.pop("video"), record
+
+def watch(pred_path, ground_truth, out_path, metrics, min_emotions=NUM_EMOTIONS, interval=WATCH_INTERVAL):
+    # Tails a predictions JSONL that is still being appended to (e.g. by
+    # run_inference.py), folding new records into running per-(model, video)
+    # sums and rewriting out_path whenever something arrived. Stops on Ctrl-C.
+    totals = {}
+    with open(pred_path, "rb") as f:
+        try:
+            while True:
+                if os.path.getsize(pred_path) < f.tell():
+                    # Truncated or replaced: start over
+                    f.seek(0)
+                    totals = {}
+                position = f.tell()
+                models, sums, counts = accumulate_predictions(_iter_complete_lines(f), ground_truth.index, min_emotions)
+                for m, model in enumerate(models):
+                    if model in totals:
+                        totals[model][0][:] += sums[m]
+                        totals[model][1][:] += counts[m]
+                    else:
+                        totals[model] = (sums[m], counts[m])
+                if f.tell() != position and totals:
+                    final_results = evaluate_arrays(
+                        list(totals),
+                        np.stack([model_sums for model_sums, _ in totals.values()]),
+                        np.stack([model_counts for _, model_counts in totals.values()]),
+                        ground_truth.scores, metrics,
+                    )
+                    with open(out_path, "w") as out:
+                        json.dump(final_results, out, indent=2)
+                    overall = final_results[f"{metrics[0]}_overall"]
+                    print(time.strftime("%H:%M:%S"), f"{metrics[0].upper()}:",
+                          ", ".join(f"{model}={overall[model]:.4f}" for model in totals if model in overall))
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+def evaluate_loop(predictions_data, ground_truth, metric):
+    # Compute errors
+    error_per_emotion = defaultdict(list)
+    error_overall = defaultdict(list)
+
+    for model, videos in predictions_data.items():
+        for video, predictions in videos.items():
+            video_name = clip_name(video)
+            if video_name not in ground_truth:
+                continue
+
+            pred_scores = []
+            for entry in predictions:
+                parsed = parse_emotion_string(entry["prediction"])
+                if len(parsed) == 16:
+                    pred_scores.append(parsed)
+
+            if not pred_scores:
+                continue
+
+            avg_pred = {k: np.mean([p[k] for p in pred_scores]) for k in EMOTION_KEYS}
+            gt = ground_truth[video_name]
+
+            for emotion in EMOTION_KEYS:
+                err = compute_error(avg_pred[emotion], gt[emotion], metric)
+                error_per_emotion[(model, emotion)].append(err)
+
+            overall = np.mean([compute_error(avg_pred[k], gt[k], metric) for k in EMOTION_KEYS])
+            error_overall[model].append(overall)
+
+    # try a baseline guess of 3
+    baseline_model = "baseline"
+    for video in ground_truth:
+        pred_scores = {emotion: 3.0 for emotion in EMOTION_KEYS}
+        gt = ground_truth[video]
+        overall = np.mean([compute_error(pred_scores[k], gt[k], metric) for k in EMOTION_KEYS])
+        error_overall[baseline_model].append(overall)
+
+        for emotion in EMOTION_KEYS:
+            err = compute_error(pred_scores[emotion], gt[emotion], metric)
+            error_per_emotion[(baseline_model, emotion)].append(err)
+
+    # try a random guess
+    baseline_model2 = 'random_baseline'
+    for video in ground_truth:
+        pred_scores = {emotion: np.random.uniform(1.0, 5.0) for emotion in EMOTION_KEYS}
+        gt = ground_truth[video]
+        overall = np.mean([compute_error(pred_scores[k], gt[k], metric) for k in EMOTION_KEYS])
+        error_overall[baseline_model2].append(overall)
+
+        for emotion in EMOTION_KEYS:
+            err = compute_error(pred_scores[emotion], gt[emotion], metric)
+            error_per_emotion[(baseline_model2, emotion)].append(err)
+
+
+    # Aggregate
+    final_results = {
+        f"{metric}_overall": {
+            model: float(np.mean(errors)) for model, errors in error_overall.items()
+        },
+        f"{metric}_per_emotion": {
+            model: {
+                emotion: float(np.mean(error_per_emotion[(model, emotion)]))
+                for emotion in EMOTION_KEYS
+            }
+            for model in error_overall.keys()
+        }
+    }
+    return final_results
+
+def main(pred_path, gt_path, out_path, metrics, engine="vectorized", min_emotions=NUM_EMOTIONS,
+         cache_dir=None, watch_interval=None, n_resamples=None, seed=None, confidence=CONFIDENCE,
+         workers=None, reference=None, annotations_path=None):
+    if isinstance(metrics, str):
+        metrics = [metrics]
+
+    with instrument.stage("load") as stage:
+        ground_truth = load_ground_truth(gt_path)
+        stage.count(len(ground_truth))
+    spread = None
+    if annotations_path:
+        if engine != "vectorized" or watch_interval is not None:
+            raise ValueError("Spread-normalized errors require the vectorized engine")
+        with instrument.stage("annotations") as stage:
+            spread = load_distributions(annotations_path).spread(ground_truth.clips)
+            stage.count(int((~np.isnan(spread)).any(axis=1).sum()))
+
+    if watch_interval is not None:
+        if not pred_path.endswith(".jsonl"):
+            raise ValueError("Watching requires a predictions JSONL file")
+        if n_resamples:
+            raise ValueError("Bootstrap statistics are not computed while watching")
+        watch(pred_path, ground_truth, out_path, metrics, min_emotions, watch_interval)
+        return
+
+    if is_store(pred_path) and engine != "vectorized":
+        raise ValueError("Compiled results stores require the vectorized engine")
+    if n_resamples and engine != "vectorized":
+        raise ValueError("Bootstrap statistics require the vectorized engine")
+
+    if engine == "vectorized":
+        with instrument.stage("aggregate") as stage:
+            if is_store(pred_path):
+                store = ResultsStore(pred_path)
+                models, sums, counts = accumulate_store(store, ground_truth.index, min_emotions)
+                stage.count(len(store.model_idx))
+            elif cache_dir:
+                # Only the records of stale models are parsed, and not counted
+                models, sums, counts = accumulate_cached(pred_path, ground_truth.index, min_emotions, cache_dir)
+            else:
+                records = stage.counted(iter_predictions(pred_path))
+                models, sums, counts = accumulate_predictions(records, ground_truth.index, min_emotions)
+        with instrument.stage("evaluate") as stage:
+            rng = None if seed is None else np.random.default_rng(seed)
+            final_results = evaluate_arrays(models, sums, counts, ground_truth.scores, metrics, rng, spread)
+            stage.count(len(models))
+        if n_resamples:
+            with instrument.stage("bootstrap") as stage:
+                final_results.update(bootstrap_arrays(
+                    models, sums, counts, ground_truth.scores, metrics, n_resamples, seed, confidence, workers, reference
+                ))
+                stage.count(n_resamples)
+    elif engine == "loop":
+        with instrument.stage("load_predictions"):
+            predictions_data = load_predictions(pred_path)
+        final_results = {}
+        with instrument.stage("evaluate") as stage:
+            for metric in metrics:
+                final_results.update(evaluate_loop(predictions_data, ground_truth.as_dict(), metric))
+            stage.count(len(predictions_data))
+    else:
+        raise ValueError(f"Unsupported engine: {engine}")
+
+    with instrument.stage("write"), open(out_path, "w") as f:
+        json.dump(final_results, f, indent=2)
+
+    print(f"{'/'.join(m.upper() for m in metrics)} results saved to {out_path}")
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pred", type=str, required=True, help="Path to predictions JSON/JSONL or a compiled results store")
+    parser.add_argument("--gt", type=str, required=True, help="Path to test set JSON or FilmClipsDetails.xlsx")
+    parser.add_argument("--out", type=str, required=True, help="Path to save result JSON")
+    parser.add_argument("--metric", type=str, nargs="+", choices=["mse", "mae"], default=["mse"],
+                        help="Error metric(s) to compute; several metrics are written to one result JSON")
+    parser.add_argument("--engine", type=str, choices=["vectorized", "loop"], default="vectorized",
+                        help="Evaluate with packed NumPy arrays or the original per-video loop")
+    parser.add_argument("--min-emotions", type=int, default=NUM_EMOTIONS,
+                        help="Keep responses with at least this many parsed emotions (vectorized engine only)")
+    parser.add_argument("--cache", type=str, nargs="?", const=CACHE_DIR, default=None,
+                        help=f"Reuse per-model aggregates of unchanged models from this directory (default: {CACHE_DIR})")
+    parser.add_argument("--watch", type=float, nargs="?", const=WATCH_INTERVAL, default=None, metavar="SECONDS",
+                        help="Tail a growing predictions JSONL and refresh the results every SECONDS until Ctrl-C")
+    parser.add_argument("--bootstrap", type=int, nargs="?", const=N_RESAMPLES, default=None, metavar="RESAMPLES",
+                        help=f"Add bootstrap CIs over clips, paired model tests and a multi-draw random baseline "
+                             f"(default {N_RESAMPLES} resamples)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random baseline and bootstrap resampling")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="Confidence level of bootstrap intervals")
+    parser.add_argument("--reference", type=str, help="Only test other models against this one (default: all pairs)")
+    parser.add_argument("--workers", type=int, default=None, help="Bootstrap processes (default: CPU count)")
+    parser.add_argument("--annotations", type=str, nargs="?", const=ANNOTATIONS_FILE, default=None,
+                        help=f"Add errors normalized by the inter-annotator spread of each clip, from the per-annotator "
+                             f"spreadsheet or saved distributions (default: {ANNOTATIONS_FILE})")
+    instrument.add_trace_argument(parser)
+
+    args = parser.parse_args(argv)
+    with instrument.tracing(args.trace, "evaluate"):
+        main(args.pred, args.gt, args.out, args.metric, args.engine, args.min_emotions, args.cache, args.watch,
+             args.bootstrap, args.seed, args.confidence, args.workers, args.reference, args.annotations)
+
+
+if __name__ == "__main__":
+    cli()
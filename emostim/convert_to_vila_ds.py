@@ -0,0 +1,167 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from . import instrument
+from .ground_truth import load_ground_truth
+from .annotations import load_distributions, ANNOTATIONS_FILE
+from .compact_dataset import CompactDataset
+from .dataset_io import ShardedJsonlWriter, SHARD_SIZE, MANIFEST_SUFFIX
+from .video_probe import probe_videos, filter_and_order
+from .frame_cache import cache_frames, NUM_FRAMES, FRAME_SIZE
+from .constants import PROMPT_TEMPLATES, EMOTION_LIST_TEXT
+from .splits import make_splits, fold_path, STRATEGIES, FOLDS, REPEATS, TEST_SIZE, SEED
+
+MEANS_FILE = "EmoStimFiles/FilmClipsDetails.xlsx"
+TRAIN_JSON = "dataset.json"
+TEST_JSON = "vlm_emotion_dataset_test_descriptive.json"
+TRAIN_COMPACT = "dataset.npz"
+TEST_COMPACT = "vlm_emotion_dataset_test_descriptive.npz"
+TRAIN_SHARDS = "dataset"
+TEST_SHARDS = "vlm_emotion_dataset_test_descriptive"
+CLIP_SPLIT_CSV = "clip_split_list.csv"
+CLIP_DISTRIBUTIONS = "clip_distributions.npz"
+
+
+def write_fold(job):
+    # Writes the train and test datasets of one split in every requested format
+    dataset, fold, n_splits, train_rows, test_rows, args = job
+    train_data = dataset.select_clips(train_rows, ordered=args.sort_by_duration)
+    test_data = dataset.select_clips(test_rows, ordered=args.sort_by_duration)
+    messages = []
+
+    if "json" in args.format:
+        for data, path, split in [(train_data, TRAIN_JSON, "train"), (test_data, TEST_JSON, "test")]:
+            path = fold_path(path, fold, n_splits)
+            data.export_json(path)
+            messages.append(f"Saved {len(data)} {split} entries to {path}")
+
+    if "compact" in args.format:
+        for data, path, split in [(train_data, TRAIN_COMPACT, "train"), (test_data, TEST_COMPACT, "test")]:
+            path = fold_path(path, fold, n_splits)
+            data.save(path)
+            messages.append(f"Saved {len(data)} {split} entries to {path}")
+
+    if "jsonl" in args.format:
+        for data, prefix, split in [(train_data, TRAIN_SHARDS, "train"), (test_data, TEST_SHARDS, "test")]:
+            prefix = fold_path(prefix, fold, n_splits)
+            with ShardedJsonlWriter(prefix, args.shard_size) as writer:
+                writer.write_all(data)
+            messages.append(f"Saved {len(data)} {split} entries to {len(writer.shards)} shards in {prefix}{MANIFEST_SUFFIX}")
+    return messages
+
+
+def main(args):
+    # Per-clip means, read from the cached ground-truth index instead of re-parsing the Excel file
+    with instrument.stage("load") as stage:
+        ground_truth = load_ground_truth(MEANS_FILE)
+        stage.count(len(ground_truth))
+
+    # Prompts and clip scores are stored once; records are expanded on demand
+    prompts = [template.format(EMOTION_LIST_TEXT) for template in PROMPT_TEMPLATES]
+    videos = [f"videos/{clip}.mp4" for clip in ground_truth.clips]
+    frames = None
+    if args.frame_cache:
+        with instrument.stage("frames") as stage:
+            frame_paths = cache_frames(videos, args.frame_cache, args.num_frames, args.frame_size)
+            frames = [frame_paths.get(video, "") for video in videos]
+            stage.count(len(videos))
+    dataset = CompactDataset(videos, prompts, ground_truth.scores, frames=frames)
+
+    # === Train/test splits (by clip) ===
+    with instrument.stage("split") as stage:
+        splits = make_splits(args.split, ground_truth.clips, ground_truth.scores,
+                             args.folds, args.repeats, args.test_size, args.seed)
+        stage.count(len(splits))
+
+    keep = None
+    if args.probe or args.sort_by_duration:
+        # Splits are made first, so dropping a clip never moves others between splits
+        with instrument.stage("probe") as stage:
+            infos = probe_videos(videos)
+            keep = filter_and_order(videos, infos, args.sort_by_duration)
+            stage.count(len(videos))
+        print(f"Dropped {len(videos) - len(keep)} clips whose video failed probing")
+    if args.frame_cache:
+        # Clips without frames failed probing or decoding and are left out, as by prepare
+        kept = videos if keep is None else keep
+        keep = [video for video in kept if video in frame_paths]
+        print(f"Dropped {len(kept) - len(keep)} clips without frames (video missing or undecodable)")
+    video_row = {video: row for row, video in enumerate(videos)}
+
+    jobs = []
+    for fold, (train_clips, test_clips) in enumerate(splits):
+        train_rows = [ground_truth.index[clip] for clip in train_clips]
+        test_rows = [ground_truth.index[clip] for clip in test_clips]
+        if keep is not None:
+            # Surviving clips of each split, in duration order when sorting
+            in_train, in_test = set(train_rows), set(test_rows)
+            kept_rows = [video_row[video] for video in keep]
+            train_rows = [row for row in kept_rows if row in in_train]
+            test_rows = [row for row in kept_rows if row in in_test]
+        jobs.append((dataset, fold, len(splits), train_rows, test_rows, args))
+
+    # === Save datasets ===
+    with instrument.stage("write") as stage:
+        if len(jobs) > 1 and args.workers != 1:
+            with ProcessPoolExecutor(args.workers) as pool:
+                results = list(pool.map(write_fold, jobs))
+        else:
+            results = [write_fold(job) for job in jobs]
+        stage.count(len(prompts) * sum(len(job[3]) + len(job[4]) for job in jobs))
+    for messages in results:
+        for message in messages:
+            print(message)
+
+    # === Save clip splits ===
+    import pandas as pd
+    clip_split_df = pd.DataFrame({
+        "clip_name": [clip for train_clips, test_clips in splits for clip in list(train_clips) + list(test_clips)],
+        "split": [split for train_clips, test_clips in splits
+                  for split in ["train"] * len(train_clips) + ["test"] * len(test_clips)],
+        "fold": [fold for fold, (train_clips, test_clips) in enumerate(splits)
+                 for _ in range(len(train_clips) + len(test_clips))],
+    })
+    with instrument.stage("write"):
+        clip_split_df.to_csv(CLIP_SPLIT_CSV, index=False)
+
+    print(f"Saved clip splits to {CLIP_SPLIT_CSV}")
+
+    if args.distributions:
+        # Per-annotator rating distributions of the dataset clips, in ground-truth order
+        with instrument.stage("distributions") as stage:
+            distributions = load_distributions(ANNOTATIONS_FILE).select(ground_truth.clips)
+            distributions.save(CLIP_DISTRIBUTIONS)
+            stage.count(len(distributions))
+        print(f"Saved rating distributions of {int((distributions.counts > 0).any(axis=1).sum())} clips to {CLIP_DISTRIBUTIONS}")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", type=str, nargs="+", choices=["json", "compact", "jsonl"], default=["json", "compact"],
+                        help="Write VILA JSON, the compact template-factored .npz and/or sharded JSONL")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Records per JSONL shard")
+    parser.add_argument("--probe", action="store_true", help="Probe videos and drop clips whose video is missing or undecodable")
+    parser.add_argument("--sort-by-duration", action="store_true",
+                        help="Order clips within each split by video duration (implies --probe)")
+    parser.add_argument("--frame-cache", type=str,
+                        help="Decode sampled frames once per clip into this directory and reference them from each entry")
+    parser.add_argument("--num-frames", type=int, default=NUM_FRAMES, help="Frames sampled per clip for --frame-cache")
+    parser.add_argument("--frame-size", type=int, default=FRAME_SIZE, help="Frame width and height for --frame-cache")
+    parser.add_argument("--split", type=str, choices=STRATEGIES, default="holdout",
+                        help="Single train/test split, k folds, repeated random splits or k folds stratified by dominant emotion")
+    parser.add_argument("--folds", type=int, default=FOLDS, help="Number of folds for kfold/stratified")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Number of random splits for repeated")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE, help="Test fraction for holdout/repeated")
+    parser.add_argument("--seed", type=int, default=SEED, help="Random seed of the split")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes writing fold datasets in parallel (default: CPU count; 1 writes serially)")
+    parser.add_argument("--distributions", action="store_true",
+                        help=f"Also write per-clip rating std, quantiles and 1-5 histograms from {ANNOTATIONS_FILE} "
+                             f"to {CLIP_DISTRIBUTIONS}")
+    instrument.add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    with instrument.tracing(args.trace, "convert"):
+        main(args)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,199 @@
+import os
+import json
+import bisect
+import argparse
+import numpy as np
+from .prediction_reader import iter_json_array
+
+# Streaming writers for VILA-style entry lists.
+#
+# write_json_array produces exactly what json.dump(entries, f, indent=2) would,
+# one entry at a time. ShardedJsonlWriter splits entries into fixed-size JSONL
+# shards, each with an .idx.npy sidecar of uint64 byte offsets (one per record
+# plus the end of the file), and a <prefix>.shards.json manifest listing them.
+# ShardedJsonlReader uses the offsets to seek straight to any record or slice.
+
+SHARD_SIZE = 10000
+MANIFEST_SUFFIX = ".shards.json"
+
+
+def write_json_array(path, entries):
+    count = 0
+    with open(path, "w") as f:
+        f.write("[")
+        for entry in entries:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(entry, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+class ShardedJsonlWriter:
+    def __init__(self, prefix, shard_size=SHARD_SIZE, append=False):
+        # With append=True, existing shards are kept and new records go into new
+        # shards listed after them in the manifest.
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shards = []
+        if append and os.path.exists(prefix + MANIFEST_SUFFIX):
+            with open(prefix + MANIFEST_SUFFIX, "r") as f:
+                self.shards = json.load(f)["shards"]
+        self._file = None
+        self._offsets = []
+
+    def _shard_paths(self, shard):
+        base = f"{self.prefix}-{shard:05d}"
+        return f"{base}.jsonl", f"{base}.idx.npy"
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._offsets.append(self._file.tell())
+        self._file.close()
+        path, index_path = self._shard_paths(len(self.shards))
+        np.save(index_path, np.array(self._offsets, dtype=np.uint64))
+        self.shards.append({
+            "path": os.path.basename(path),
+            "index": os.path.basename(index_path),
+            "records": len(self._offsets) - 1,
+        })
+        self._file = None
+        self._offsets = []
+
+    def write(self, entry):
+        if self._file is None:
+            path, _ = self._shard_paths(len(self.shards))
+            self._file = open(path, "wb")
+        self._offsets.append(self._file.tell())
+        self._file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        if len(self._offsets) >= self.shard_size:
+            self._close_shard()
+
+    def write_all(self, entries):
+        for entry in entries:
+            self.write(entry)
+        return self
+
+    def close(self):
+        self._close_shard()
+        manifest = {
+            "shard_size": self.shard_size,
+            "records": sum(shard["records"] for shard in self.shards),
+            "shards": self.shards,
+        }
+        with open(self.prefix + MANIFEST_SUFFIX, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest["records"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            # A failed run leaves the previous manifest in place instead of
+            # publishing a partial one
+            self._file.close()
+            self._file = None
+
+
+class ShardedJsonlReader:
+    def __init__(self, prefix):
+        manifest_path = prefix if prefix.endswith(MANIFEST_SUFFIX) else prefix + MANIFEST_SUFFIX
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        root = os.path.dirname(manifest_path)
+        self.shards = [
+            (os.path.join(root, shard["path"]), os.path.join(root, shard["index"]))
+            for shard in manifest["shards"]
+        ]
+        self.starts = [0]
+        for shard in manifest["shards"]:
+            self.starts.append(self.starts[-1] + shard["records"])
+        self._offsets = {}
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def offsets(self, shard):
+        if shard not in self._offsets:
+            self._offsets[shard] = np.load(self.shards[shard][1], mmap_mode="r")
+        return self._offsets[shard]
+
+    def _locate(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard = bisect.bisect_right(self.starts, i) - 1
+        return shard, i - self.starts[shard]
+
+    def __getitem__(self, i):
+        shard, row = self._locate(i)
+        offsets = self.offsets(shard)
+        with open(self.shards[shard][0], "rb") as f:
+            f.seek(int(offsets[row]))
+            return json.loads(f.read(int(offsets[row + 1] - offsets[row])))
+
+    def iter_range(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        i = start
+        while i < stop:
+            shard, row = self._locate(i)
+            n = min(stop - i, self.starts[shard + 1] - i)
+            offsets = self.offsets(shard)
+            with open(self.shards[shard][0], "rb") as f:
+                f.seek(int(offsets[row]))
+                for _ in range(n):
+                    yield json.loads(f.readline())
+            i += n
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def worker_range(self, rank, world_size):
+        # Contiguous, near-equal slice of the records for one of world_size workers
+        per_worker, extra = divmod(len(self), world_size)
+        start = rank * per_worker + min(rank, extra)
+        return start, start + per_worker + (rank < extra)
+
+    def iter_worker(self, rank, world_size):
+        return self.iter_range(*self.worker_range(rank, world_size))
+
+
+def iter_manifest(path, rank=0, world_size=1):
+    # Entries of a VILA manifest: a JSON array, plain JSONL, or a sharded JSONL
+    # prefix / .shards.json manifest. Sharded manifests are read for one worker
+    # slice only; the other formats must use rank 0 of 1.
+    if path.endswith(MANIFEST_SUFFIX) or os.path.exists(path + MANIFEST_SUFFIX):
+        return ShardedJsonlReader(path).iter_worker(rank, world_size)
+    if world_size != 1:
+        raise ValueError("Worker slices require a sharded JSONL manifest")
+    if path.endswith(".jsonl"):
+        return _iter_jsonl_entries(path)
+    return iter_json_array(path)
+
+
+def _iter_jsonl_entries(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Print the records of one worker's slice of a sharded dataset")
+    parser.add_argument("--src", type=str, required=True, help="Shard prefix or .shards.json manifest")
+    parser.add_argument("--rank", type=int, default=0, help="Worker rank")
+    parser.add_argument("--world-size", type=int, default=1, help="Number of workers")
+
+    args = parser.parse_args(argv)
+    reader = ShardedJsonlReader(args.src)
+    for entry in reader.iter_worker(args.rank, args.world_size):
+        print(json.dumps(entry))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,120 @@
+import re
+import time
+import json
+import argparse
+import numpy as np
+from .constants import EMOTION_KEYS, NUM_EMOTIONS, SHORT_EMOTION_NAMES
+
+# "Label: score" pairs, separated by commas or newlines. Scanning the whole
+# response lets a pair be recovered even when the model prefixes it with chatter.
+_PAIR_RE = re.compile(r"([^:,\n]+?)\s*:\s*(\d+(?:\.\d*)?|\.\d+)")
+_LABEL_STRIP = " \t*-•\"'`"
+
+
+def _normalize_label(label):
+    label = label.strip(_LABEL_STRIP).replace("/", " / ")
+    return " ".join(label.split()).lower()
+
+
+def _build_label_index():
+    index = {}
+    for i, key in enumerate(EMOTION_KEYS):
+        aliases = [key, SHORT_EMOTION_NAMES[i]] + key.split("/")
+        for alias in aliases:
+            alias = _normalize_label(alias)
+            if index.setdefault(alias, i) != i:
+                raise ValueError(f"Ambiguous emotion alias: {alias}")
+    return index
+
+
+# Exact labels hit the first lookup; everything else goes through normalization
+EXACT_LABEL_INDEX = {key: i for i, key in enumerate(EMOTION_KEYS)}
+LABEL_INDEX = _build_label_index()
+
+
+def label_to_index(label):
+    idx = EXACT_LABEL_INDEX.get(label)
+    if idx is None:
+        idx = LABEL_INDEX.get(_normalize_label(label))
+    return idx
+
+
+def parse_emotion_row(text, out, mask):
+    # Writes the scores of one response into out[16] and flags them in mask[16].
+    # Later occurrences of a label overwrite earlier ones. Returns the number of
+    # emotions found.
+    for label, score in _PAIR_RE.findall(text):
+        idx = EXACT_LABEL_INDEX.get(label.strip())
+        if idx is None:
+            idx = LABEL_INDEX.get(_normalize_label(label))
+            if idx is None:
+                continue
+        out[idx] = float(score)
+        mask[idx] = True
+    return int(mask.sum())
+
+
+def parse_emotion_batch(texts, out=None, mask=None, dtype=np.float32):
+    n = len(texts)
+    if out is None:
+        out = np.zeros((n, NUM_EMOTIONS), dtype=dtype)
+    if mask is None:
+        mask = np.zeros((n, NUM_EMOTIONS), dtype=bool)
+    for i, text in enumerate(texts):
+        parse_emotion_row(text, out[i], mask[i])
+    return out, mask
+
+
+def drop_incomplete(mask, min_emotions=NUM_EMOTIONS):
+    # Clears the mask of responses with fewer than min_emotions parsed labels
+    mask[mask.sum(axis=-1) < min_emotions] = False
+    return mask
+
+
+def parse_emotion_string(text):
+    emotion_dict = {}
+    for label, score in _PAIR_RE.findall(text):
+        idx = label_to_index(label.strip())
+        if idx is not None:
+            emotion_dict[EMOTION_KEYS[idx]] = float(score)
+    return emotion_dict
+
+
+def main(pred_path, repeat):
+    with open(pred_path, "r") as f:
+        predictions_data = json.load(f)
+
+    texts = [
+        entry["prediction"]
+        for videos in predictions_data.values()
+        for predictions in videos.values()
+        for entry in predictions
+    ]
+    out = np.zeros((len(texts), NUM_EMOTIONS), dtype=np.float32)
+    mask = np.zeros((len(texts), NUM_EMOTIONS), dtype=bool)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        mask[:] = False
+        parse_emotion_batch(texts, out, mask)
+    elapsed = time.perf_counter() - start
+
+    counts = mask.sum(axis=1)
+    print(f"responses: {len(texts)}")
+    print(f"complete: {int((counts == NUM_EMOTIONS).sum())}, "
+          f"partial: {int(((counts > 0) & (counts < NUM_EMOTIONS)).sum())}, "
+          f"empty: {int((counts == 0).sum())}")
+    print(f"throughput: {len(texts) * repeat / elapsed:,.0f} responses/s")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark the emotion response parser")
+    parser.add_argument("--pred", type=str, required=True, help="Path to predictions JSON")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of passes over all responses")
+
+    args = parser.parse_args(argv)
+    main(args.pred, args.repeat)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import numpy as np
+from .emotion_parser import NUM_EMOTIONS
+from .ground_truth import clip_name
+from .prediction_reader import iter_predictions, accumulate_scores
+from .results_store import source_stamp
+
+# Per-model cache of aggregated predictions for compute_vila_error.py --cache.
+# Each model's block of predictions is hashed (videos, prompts and predictions in
+# file order); its per-clip score sums and per-emotion counts are stored in
+# <cache_dir>/v<version>-<hash>-<min_emotions>.npz. On a rerun only models whose
+# hash has no cache entry are parsed. The model hashes of the last file seen are
+# kept in <cache_dir>/sources.json by file stamp, so an untouched predictions
+# file is not even read. Sums are keyed by clip name, independent of the ground
+# truth, so errors are recomputed from them on every run. Whenever a file is
+# re-hashed, sources whose file is gone are forgotten and entries no longer
+# referenced by any source are deleted.
+
+CACHE_DIR = ".cache/eval"
+CACHE_VERSION = 1
+SOURCES = "sources.json"
+
+
+def model_hashes(pred_path):
+    digests = {}
+    for model, video, entry in iter_predictions(pred_path):
+        digest = digests.get(model)
+        if digest is None:
+            digest = digests[model] = hashlib.blake2b(digest_size=16)
+        digest.update(f"{video}\0{entry['prompt']}\0{entry['prediction']}\0".encode("utf-8"))
+    return {model: digest.hexdigest() for model, digest in digests.items()}
+
+
+def _cache_path(cache_dir, model_hash, min_emotions):
+    return os.path.join(cache_dir, f"v{CACHE_VERSION}-{model_hash}-{min_emotions}.npz")
+
+
+def _load_sources(cache_dir):
+    path = os.path.join(cache_dir, SOURCES)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_sources(cache_dir, sources):
+    path = os.path.join(cache_dir, SOURCES)
+    with open(path + ".tmp", "w") as f:
+        json.dump(sources, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _prune(cache_dir, sources):
+    for path in [path for path in sources if not os.path.exists(path)]:
+        del sources[path]
+    referenced = {model_hash for source in sources.values() for model_hash in source["models"].values()}
+    for name in os.listdir(cache_dir):
+        parts = name.split("-")
+        if name.endswith(".npz") and len(parts) == 3 and parts[0].startswith("v"):
+            if parts[0] != f"v{CACHE_VERSION}" or parts[1] not in referenced:
+                os.remove(os.path.join(cache_dir, name))
+
+
+def cached_model_totals(pred_path, cache_dir=CACHE_DIR, min_emotions=NUM_EMOTIONS):
+    # Returns ({model: (clips, sums, counts)} in file order, list of models that
+    # had to be parsed)
+    os.makedirs(cache_dir, exist_ok=True)
+    stamp = source_stamp(pred_path)
+    sources = _load_sources(cache_dir)
+    known = sources.get(stamp["path"])
+    if known and known["stamp"] == stamp:
+        hashes = known["models"]
+    else:
+        hashes = model_hashes(pred_path)
+        sources[stamp["path"]] = {"stamp": stamp, "models": hashes}
+        _prune(cache_dir, sources)
+        _save_sources(cache_dir, sources)
+
+    totals = {}
+    stale = [model for model, model_hash in hashes.items()
+             if not os.path.exists(_cache_path(cache_dir, model_hash, min_emotions))]
+    if stale:
+        wanted = set(stale)
+
+        def key_fn(model, video):
+            return (model, clip_name(video)) if model in wanted else None
+
+        keys, sums, counts = accumulate_scores(iter_predictions(pred_path), key_fn, min_emotions)
+        for model in stale:
+            rows = [i for i, (key_model, _) in enumerate(keys) if key_model == model]
+            clips = np.array([keys[i][1] for i in rows], dtype=str)
+            path = _cache_path(cache_dir, hashes[model], min_emotions)
+            np.savez(path + ".tmp.npz", clips=clips, sums=sums[rows], counts=counts[rows])
+            os.replace(path + ".tmp.npz", path)
+
+    for model, model_hash in hashes.items():
+        with np.load(_cache_path(cache_dir, model_hash, min_emotions), allow_pickle=False) as cached:
+            totals[model] = (cached["clips"], cached["sums"], cached["counts"])
+    return totals, stale
+
+
+def pack_totals(totals, video_index):
+    # {model: (clips, sums, counts)} -> models, (models, videos, 16) sums and
+    # counts with videos in ground-truth order, as accumulate_predictions returns
+    models = list(totals)
+    shape = (len(models), len(video_index), NUM_EMOTIONS)
+    sums = np.zeros(shape, dtype=np.float64)
+    counts = np.zeros(shape, dtype=np.int64)
+    for m, (clips, model_sums, model_counts) in enumerate(totals.values()):
+        rows = np.array([video_index.get(str(clip), -1) for clip in clips], dtype=np.intp)
+        keep = rows >= 0
+        np.add.at(sums[m], rows[keep], model_sums[keep])
+        np.add.at(counts[m], rows[keep], model_counts[keep])
+    return models, sums, counts
@@ -0,0 +1,102 @@
+import os
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .video_probe import scan_videos, probe_videos, DB_PATH, PROBE_TIMEOUT
+
+# Decodes each unique video once, samples NUM_FRAMES frames uniformly over its
+# duration, letterboxes them to FRAME_SIZE x FRAME_SIZE and stores them as a
+# uint8 (frames, height, width, 3) .npy in CACHE_DIR, named after the video's
+# content hash and the sampling settings. Every prompt template of a clip then
+# reads the same array with np.load(mmap_mode="r") instead of decoding the MP4.
+
+CACHE_DIR = ".cache/frames"
+NUM_FRAMES = 8
+FRAME_SIZE = 448
+
+
+def frames_path(cache_dir, content_hash, num_frames, size):
+    return os.path.join(cache_dir, f"{content_hash}-{num_frames}x{size}x{size}.npy")
+
+
+def extract_frames(path, duration, num_frames=NUM_FRAMES, size=FRAME_SIZE):
+    rate = num_frames / duration if duration and duration > 0 else 1.0
+    vf = (
+        f"fps={rate},scale={size}:{size}:force_original_aspect_ratio=decrease,"
+        f"pad={size}:{size}:(ow-iw)/2:(oh-ih)/2"
+    )
+    cmd = [
+        "ffmpeg", "-v", "error", "-i", path, "-map", "0:v:0", "-vf", vf,
+        "-frames:v", str(num_frames), "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, timeout=PROBE_TIMEOUT * 10)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{path}: {proc.stderr.decode(errors='replace').strip()}")
+    frames = np.frombuffer(proc.stdout, dtype=np.uint8)
+    return frames.reshape(-1, size, size, 3)
+
+
+def _cache_one(job):
+    # (out_path, error); a video that fails to decode is reported, not raised,
+    # so it cannot abort the other videos of the run
+    path, duration, out_path, num_frames, size = job
+    if os.path.exists(out_path):
+        return out_path, None
+    try:
+        frames = extract_frames(path, duration, num_frames, size)
+    except (RuntimeError, ValueError, OSError, subprocess.TimeoutExpired) as e:
+        return out_path, f"{type(e).__name__}: {e}"
+    tmp_path = out_path + ".tmp.npy"
+    np.save(tmp_path, frames)
+    os.replace(tmp_path, out_path)
+    return out_path, None
+
+
+def cache_frames(videos, cache_dir=CACHE_DIR, num_frames=NUM_FRAMES, size=FRAME_SIZE,
+                 workers=None, db_path=DB_PATH):
+    # Returns {video: frames .npy path} for every video that probes and decodes
+    # fine. Videos with identical content share one array and are decoded once.
+    infos = probe_videos(videos, db_path, workers)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    frame_paths, jobs = {}, {}
+    for video, info in infos.items():
+        if not info.ok:
+            continue
+        out_path = frames_path(cache_dir, info.content_hash, num_frames, size)
+        frame_paths[video] = out_path
+        if out_path not in jobs and not os.path.exists(out_path):
+            jobs[out_path] = (video, info.duration, out_path, num_frames, size)
+
+    failed = set()
+    if jobs:
+        with ProcessPoolExecutor(workers) as pool:
+            for out_path, error in pool.map(_cache_one, jobs.values()):
+                if error is not None:
+                    failed.add(out_path)
+                    print(f"Failed to decode {jobs[out_path][0]}: {error}")
+    if failed:
+        print(f"Left out {sum(path in failed for path in frame_paths.values())} videos whose frames failed to decode")
+    return {video: path for video, path in frame_paths.items() if path not in failed}
+
+
+def load_frames(path):
+    return np.load(path, mmap_mode="r")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Decode and cache sampled frames for a directory of videos")
+    parser.add_argument("--videos-dir", type=str, required=True, help="Directory searched recursively for videos")
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR, help="Directory for frame arrays")
+    parser.add_argument("--num-frames", type=int, default=NUM_FRAMES, help="Frames sampled per video")
+    parser.add_argument("--size", type=int, default=FRAME_SIZE, help="Frame width and height in pixels")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: CPU count)")
+
+    args = parser.parse_args(argv)
+    frame_paths = cache_frames(scan_videos(args.videos_dir), args.cache_dir, args.num_frames, args.size, args.workers)
+    print(f"Cached frames for {len(frame_paths)} videos in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    cli()
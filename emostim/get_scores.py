@@ -0,0 +1,147 @@
+import json
+import numpy as np
+import argparse
+from . import instrument
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS
+from .prediction_reader import iter_predictions, accumulate_scores
+from .results_store import ResultsStore, is_store
+from .score_index import write_index, ScoreIndex, is_index
+from .timeline import Timeline, split_segment, segment_key
+
+DEFAULT_MODEL = 'nvila-15b-sft2ep'
+
+def normalize_video_name(name):
+    return name.split("/")[-1]
+
+def video_key(video):
+    # A windowed segment keeps its time range
+    video, start, end = split_segment(video)
+    video_name = normalize_video_name(video).split(".")[0]
+    return video_name if start is None else segment_key(video_name, start, end)
+
+def accumulate_store(store, model_name, min_emotions=NUM_EMOTIONS):
+    if model_name not in store.models:
+        raise KeyError(model_name)
+    model_rows = np.asarray(store.model_idx) == store.models.index(model_name)
+    # Videos are numbered in order of first appearance for this model
+    video_idx = np.asarray(store.video_idx)[model_rows]
+    _, first = np.unique(video_idx, return_index=True)
+    seen = video_idx[np.sort(first)]
+    video_names = list(dict.fromkeys(video_key(store.videos[v]) for v in seen))
+    name_index = {name: i for i, name in enumerate(video_names)}
+    video_map = np.array([name_index.get(video_key(video), -1) for video in store.videos], dtype=np.int64)
+
+    keys = np.where(model_rows, video_map[np.asarray(store.video_idx)], -1)
+    sums, counts = store.aggregate(keys, len(video_names), min_emotions)
+    return video_names, sums, counts
+
+def average_scores(pred_path, model_names, min_emotions=NUM_EMOTIONS):
+    # Returns {model: (video names, (videos, 16) averages)}, NaN where a video
+    # has no valid response. Predictions files are read in a single pass.
+    with instrument.stage("aggregate") as stage:
+        if is_store(pred_path):
+            store = ResultsStore(pred_path)
+            totals = {model_name: accumulate_store(store, model_name, min_emotions) for model_name in model_names}
+            stage.count(len(store.model_idx))
+        else:
+            wanted = set(model_names)
+            seen = set()
+
+            def key_fn(model, video):
+                if model not in wanted:
+                    return None
+                seen.add(model)
+                return model, video_key(video)
+
+            records = stage.counted(iter_predictions(pred_path))
+            keys, sums, counts = accumulate_scores(records, key_fn, min_emotions)
+            totals = {}
+            for model_name in model_names:
+                # As for stores (and a plain dict lookup), a missing model is an error
+                if model_name not in seen:
+                    raise KeyError(model_name)
+                rows = [i for i, (model, _) in enumerate(keys) if model == model_name]
+                totals[model_name] = ([keys[i][1] for i in rows], sums[rows], counts[rows])
+
+    return {
+        model_name: (video_names, np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0))
+        for model_name, (video_names, sums, counts) in totals.items()
+    }
+
+
+def main(pred_path, out_path, model_names=(DEFAULT_MODEL,), min_emotions=NUM_EMOTIONS, store_path=None,
+         timeline_path=None):
+    model_scores = average_scores(pred_path, model_names, min_emotions)
+
+    # Segments of windowed inference are summarized per video; the per-segment
+    # averages form the timeline
+    timeline = Timeline.from_scores(model_scores)
+    if len(timeline):
+        model_scores = timeline.merge_summary(model_scores)
+        print(f"Summarized {len(timeline.starts)} segments of {len(timeline)} videos")
+    if timeline_path:
+        if not len(timeline):
+            raise ValueError(f"{pred_path} has no windowed predictions to build a timeline from")
+        with instrument.stage("timeline") as stage:
+            timeline.save(timeline_path)
+            stage.count(len(timeline.starts))
+        print(f"Saved the emotion timelines to {timeline_path}")
+
+    if out_path:
+        results = {
+            model_name: {
+                video_name: {emotion: float(score) for emotion, score in zip(EMOTION_KEYS, scores)}
+                for video_name, scores in zip(video_names, avg_pred)
+            }
+            for model_name, (video_names, avg_pred) in model_scores.items()
+        }
+        # A single model keeps the flat {video: scores} layout
+        videos_results = results[model_names[0]] if len(model_names) == 1 else results
+        with instrument.stage("write") as stage, open(out_path, "w") as f:
+            json.dump(videos_results, f, indent=2)
+            stage.count(sum(len(video_names) for video_names, _ in model_scores.values()))
+
+    for model_name, (video_names, _) in model_scores.items():
+        if len(model_names) == 1:
+            print('total videos:', len(video_names))
+        else:
+            print(f'total videos: {len(video_names)} ({model_name})')
+
+    if store_path:
+        # Models already in the index and not recomputed here are kept
+        if is_index(store_path):
+            index = ScoreIndex(store_path, mmap_mode=None)
+            kept = {model: index.model_slice(model) for model in index.models if model not in model_scores}
+            model_scores = {
+                **{model: (index.videos[rows], index.scores[rows]) for model, rows in kept.items()},
+                **model_scores,
+            }
+        with instrument.stage("index") as stage:
+            write_index(store_path, model_scores)
+            stage.count(sum(len(videos) for videos, _ in model_scores.values()))
+        print(f"Indexed {sum(len(videos) for videos, _ in model_scores.values())} videos "
+              f"for {len(model_scores)} models in {store_path}")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pred", type=str, required=True, help="Path to predictions JSON/JSONL or a compiled results store")
+    parser.add_argument("--out", type=str, help="Path to save result JSON")
+    parser.add_argument("--model", type=str, nargs="+", default=[DEFAULT_MODEL],
+                        help="Models to extract; more than one nests the output JSON by model")
+    parser.add_argument("--store", type=str, help="Also write the averages into this score index (see `emostim index`)")
+    parser.add_argument("--timeline", type=str,
+                        help="Save per-segment scores of windowed predictions to this .npz (see `emostim timeline`)")
+    parser.add_argument("--min-emotions", type=int, default=NUM_EMOTIONS,
+                        help="Keep responses with at least this many parsed emotions")
+    instrument.add_trace_argument(parser)
+
+    args = parser.parse_args(argv)
+    if not (args.out or args.store):
+        parser.error("nothing to do: pass --out and/or --store")
+    with instrument.tracing(args.trace, "scores"):
+        main(args.pred, args.out, args.model, args.min_emotions, args.store, args.timeline)
+
+
+if __name__ == "__main__":
+    cli()
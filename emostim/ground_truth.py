@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS, SHORT_EMOTION_NAMES, parse_emotion_batch
+from .timeline import split_segment
+
+# Ground truth is a (clips, 16) float64 matrix in EMOTION_KEYS order plus the clip
+# names (file stems, e.g. "28DaysLater_clip_4"). It is built from either the
+# EmoStim means spreadsheet or a VILA-format test JSON and cached under
+# CACHE_DIR by the SHA-256 of the source file, so an edited source is rebuilt.
+
+CACHE_DIR = ".cache/ground_truth"
+CACHE_VERSION = 1
+MEANS_SHEET = "in"
+
+
+def clip_name(video):
+    # Segments of windowed inference count towards their whole clip
+    return os.path.splitext(os.path.basename(split_segment(video)[0]))[0]
+
+
+class GroundTruth:
+    def __init__(self, clips, scores):
+        self.clips = [str(clip) for clip in clips]
+        self.scores = np.asarray(scores, dtype=np.float64).reshape(len(self.clips), NUM_EMOTIONS)
+        self.index = {clip: i for i, clip in enumerate(self.clips)}
+
+    def __len__(self):
+        return len(self.clips)
+
+    def __contains__(self, video):
+        return clip_name(video) in self.index
+
+    def row(self, video):
+        return self.index.get(clip_name(video))
+
+    def as_dict(self):
+        return {
+            clip: dict(zip(EMOTION_KEYS, (float(s) for s in scores)))
+            for clip, scores in zip(self.clips, self.scores)
+        }
+
+
+def _mean_by_clip(clips, scores, mask):
+    # Averages rows per clip (first-appearance order); clips need every emotion
+    # present in at least one row.
+    unique, first, inverse = np.unique(clips, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    groups = rank[inverse]
+
+    sums = np.zeros((len(unique), NUM_EMOTIONS))
+    counts = np.zeros((len(unique), NUM_EMOTIONS))
+    np.add.at(sums, groups, np.where(mask, scores, 0.0))
+    np.add.at(counts, groups, mask)
+    complete = (counts > 0).all(axis=1)
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return GroundTruth(unique[order][complete], means[complete])
+
+
+def build_from_excel(path, sheet_name=MEANS_SHEET):
+    import pandas as pd
+
+    df_means = pd.read_excel(path, sheet_name=sheet_name)
+    scores = df_means[SHORT_EMOTION_NAMES].to_numpy(dtype=np.float64)
+    clips = df_means["clip_name"].astype(str).to_numpy()
+    return _mean_by_clip(clips, scores, np.ones(scores.shape, dtype=bool))
+
+
+def build_from_test_json(path):
+    with open(path, "r") as f:
+        ground_truth_data = json.load(f)
+
+    clips, texts = [], []
+    for item in ground_truth_data:
+        for conv in item["conversations"]:
+            if conv["from"] == "gpt":
+                clips.append(clip_name(item["video"]))
+                texts.append(conv["value"])
+    scores, mask = parse_emotion_batch(texts, dtype=np.float64)
+    # Only fully parsed responses count towards the ground truth
+    mask &= mask.all(axis=1, keepdims=True)
+    return _mean_by_clip(np.array(clips, dtype=str), scores, mask)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_ground_truth(path, cache_dir=CACHE_DIR):
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"v{CACHE_VERSION}-{file_sha256(path)}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path, allow_pickle=False) as cached:
+                return GroundTruth(cached["clips"], cached["scores"])
+
+    if path.endswith((".xlsx", ".xls")):
+        ground_truth = build_from_excel(path)
+    else:
+        ground_truth = build_from_test_json(path)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(tmp_path, clips=np.array(ground_truth.clips, dtype=str), scores=ground_truth.scores)
+        os.replace(tmp_path, cache_path)
+    return ground_truth
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Build (or refresh) the cached ground-truth index")
+    parser.add_argument("--src", type=str, required=True, help="FilmClipsDetails.xlsx or a test set JSON")
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR, help="Directory for cached indexes")
+
+    args = parser.parse_args(argv)
+    ground_truth = load_ground_truth(args.src, args.cache_dir)
+    print(f"Ground truth for {len(ground_truth)} clips from {args.src}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,70 @@
+import json
+import time
+import random
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .emotion_parser import EMOTION_KEYS
+
+# Minimal stand-in for an OpenAI-compatible chat endpoint, for exercising
+# run_inference.py without a model: answers every /v1/chat/completions request
+# with random 1-5 scores for all 16 emotions after an optional delay, and fails
+# a configurable fraction of requests with HTTP 503.
+
+
+def fake_prediction(rng):
+    return ", ".join(f"{label}: {rng.randint(1, 5)}" for label in EMOTION_KEYS)
+
+
+def make_handler(latency, failure_rate, seed):
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            if rng.random() < failure_rate:
+                self.send_error(503)
+                return
+            time.sleep(latency)
+            content = fake_prediction(rng)
+            prompt = "".join(
+                part.get("text", "")
+                for message in body.get("messages", [])
+                for part in (message["content"] if isinstance(message["content"], list) else [{"text": message["content"]}])
+            )
+            response = json.dumps({
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split())},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Serve random emotion ratings on an OpenAI-compatible endpoint")
+    parser.add_argument("--host", type=str, default="localhost", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to wait before each response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.latency, args.failure_rate, args.seed))
+    print(f"Serving on http://{args.host}:{args.port}/v1/chat/completions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    cli()
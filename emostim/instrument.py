@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import socket
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Opt-in per-stage timing for the command line tools. Code marks its stages with
+#     with instrument.stage("parse") as s:
+#         ...
+#         s.count(n_records)
+# and `--trace <path>` (or EMOSTIM_TRACE) turns recording on. Every stage name
+# accumulates wall time, CPU time of this process and of finished child processes
+# (process pools), the number of calls and the records counted. Stages may nest
+# (e.g. "parse" runs inside "aggregate"), so their times are not additive.
+# Streaming readers read and parse in one pass, so file loading is part of the
+# stage that consumes the records. Peak RSS is the process high-water mark when
+# the stage last exited.
+#
+# When the run ends one JSON line per stage plus a "total" line is appended to
+# the trace (a path ending in .json gets a single JSON document instead), all
+# carrying the same run id. Without a trace, stage() returns a shared no-op
+# object, so instrumented code pays one function call per stage.
+
+TRACE_ENV = "EMOSTIM_TRACE"
+
+
+def _cpu_times():
+    t = os.times()
+    return t.user + t.system, t.children_user + t.children_system
+
+
+def _peak_rss_mb(who=None):
+    if resource is None:
+        return None
+    who = resource.RUSAGE_SELF if who is None else who
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 2 ** 20
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, n=1):
+        pass
+
+    def counted(self, iterable):
+        return iterable
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    def __init__(self, totals):
+        self.totals = totals
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu, self.children_cpu = _cpu_times()
+        return self
+
+    def __exit__(self, *exc):
+        cpu, children_cpu = _cpu_times()
+        totals = self.totals
+        totals["wall_s"] += time.perf_counter() - self.wall
+        totals["cpu_s"] += cpu - self.cpu
+        totals["children_cpu_s"] += children_cpu - self.children_cpu
+        totals["calls"] += 1
+        totals["peak_rss_mb"] = _peak_rss_mb()
+        return False
+
+    def count(self, n=1):
+        self.totals["records"] += n
+
+    def counted(self, iterable):
+        # Counts items as they are consumed, for stages fed by a generator
+        totals = self.totals
+        for item in iterable:
+            totals["records"] += 1
+            yield item
+
+
+class Tracer:
+    def __init__(self, path, command=None):
+        self.path = path
+        self.command = command
+        self.run = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        self.stages = {}
+        self.started = time.time()
+        self.wall = time.perf_counter()
+        self.cpu, self.children_cpu = _cpu_times()
+
+    def stage(self, name):
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = self.stages[name] = {"calls": 0, "records": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                          "children_cpu_s": 0.0, "peak_rss_mb": None}
+        return Stage(totals)
+
+    def report(self):
+        cpu, children_cpu = _cpu_times()
+        base = {"run": self.run, "command": self.command}
+        lines = []
+        for name, totals in self.stages.items():
+            line = {**base, "stage": name, **totals}
+            has_rate = totals["records"] and totals["wall_s"] > 0
+            line["records_per_s"] = totals["records"] / totals["wall_s"] if has_rate else None
+            lines.append(line)
+        lines.append({
+            **base,
+            "stage": "total",
+            "started": self.started,
+            "argv": sys.argv,
+            "wall_s": time.perf_counter() - self.wall,
+            "cpu_s": cpu - self.cpu,
+            "children_cpu_s": children_cpu - self.children_cpu,
+            "peak_rss_mb": _peak_rss_mb(),
+            "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        })
+        return lines
+
+    def write(self):
+        lines = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.path.endswith(".json"):
+            with open(self.path, "w") as f:
+                json.dump({"run": self.run, "command": self.command, "stages": lines}, f, indent=2)
+        else:
+            with open(self.path, "a") as f:
+                f.writelines(json.dumps(line) + "\n" for line in lines)
+
+
+_tracer = None
+
+
+def stage(name):
+    return _NULL_STAGE if _tracer is None else _tracer.stage(name)
+
+
+@contextmanager
+def tracing(path, command=None):
+    # Records the stages run inside the block and writes the trace when it ends,
+    # also when the command fails or is interrupted
+    global _tracer
+    if not path:
+        yield None
+        return
+    _tracer = Tracer(path, command)
+    try:
+        yield _tracer
+    finally:
+        tracer, _tracer = _tracer, None
+        tracer.write()
+
+
+def add_trace_argument(parser):
+    parser.add_argument("--trace", type=str, default=os.environ.get(TRACE_ENV),
+                        help=f"Append per-stage wall/CPU time, peak RSS and record counts to this JSONL trace "
+                             f"(.json writes one document; default: ${TRACE_ENV})")
@@ -0,0 +1,246 @@
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from . import instrument
+from .constants import FULL_EMOTION_LABEL_MAP
+from .results_store import ResultsStore, is_store
+
+# Renders the model comparison figures for any number of metric result files
+# (`emostim evaluate` output, or compiled results stores evaluated on the
+# fly). Every metric in every file gets three figures, rendered in a process
+# pool; each figure is drawn once and saved in all requested formats. The hash
+# of a figure's input data is kept in HASH_CACHE, and a figure whose hash and
+# output files are unchanged is skipped.
+
+HASH_CACHE = ".cache/plot_hashes.json"
+# Bump when the drawing code changes, so cached hashes no longer match
+RENDER_VERSION = 1
+RANDOM_BASELINE_SEED = 0
+FORMATS = ["pdf", "svg"]
+SAVE_OPTIONS = {
+    "svg": {"transparent": True, "facecolor": "none"},
+}
+METRIC_LABELS = {
+    "mae": "Mean Absolute Error (MAE)",
+    "mse": "Mean Squared Error (MSE)",
+}
+
+# === Rename and filter models ===
+exclude_model = "NVILA-15B"
+rename_map = {
+    "nvila-15b-sft": "NVILA-Lite-15B-Video (1 epoch)",
+    "nvila-15b-sft2ep": "NVILA-Lite-15B-Video (2 epochs)",
+    "nvila-15b-sft3ep": "NVILA-Lite-15B-Video (3 epochs)",
+    "baseline": "Baseline (always 3)",
+    "random_baseline": "Random Baseline (1–5)"
+}
+compact_label_map = {
+    "NVILA-Lite-15B-Video (1 epoch)": "SFT-1ep",
+    "NVILA-Lite-15B-Video (2 epochs)": "SFT-2ep",
+    "NVILA-Lite-15B-Video (3 epochs)": "SFT-3ep",
+    "NVILA-Lite-15B-Video": "Pretrained",
+    "Baseline (always 3)": "Baseline",
+    "Random Baseline (1–5)": "Random",
+}
+
+# === Shorten emotion labels ===
+reverse_emotion_map = {v: k for k, v in FULL_EMOTION_LABEL_MAP.items()}
+
+
+def load_results(path, gt_path=None, metrics=("mae",)):
+    if is_store(path):
+        from .compute_vila_error import evaluate_store
+        from .ground_truth import load_ground_truth
+        import numpy as np
+        if gt_path is None:
+            raise ValueError("--gt is required when --results is a results store")
+        # A fixed random baseline keeps the figure hashes of unchanged stores stable
+        rng = np.random.default_rng(RANDOM_BASELINE_SEED)
+        return evaluate_store(ResultsStore(path), load_ground_truth(gt_path), list(metrics), rng=rng)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def result_metrics(data):
+    metrics = [key[:-len("_overall")] for key in data if key.endswith("_overall")]
+    return [metric for metric in metrics if f"{metric}_per_emotion" in data]
+
+
+def metric_tables(data, metric):
+    # Overall and per-emotion errors as plain record lists, in plotting order
+    column = metric.upper()
+    overall = [
+        {"Model": compact_label_map.get(rename_map.get(model, model), rename_map.get(model, model)), column: error}
+        for model, error in data[f"{metric}_overall"].items()
+        if model != exclude_model
+    ]
+    per_emotion = [
+        {
+            "Model": compact_label_map.get(rename_map.get(model, model), rename_map.get(model, model)),
+            "Emotion": reverse_emotion_map.get(emotion, emotion),
+            column: error,
+        }
+        for model, emotions in data[f"{metric}_per_emotion"].items()
+        if model != exclude_model
+        for emotion, error in emotions.items()
+    ]
+    return overall, per_emotion
+
+
+def figure_jobs(data, metric, out_dir, prefix=""):
+    overall, per_emotion = metric_tables(data, metric)
+    return [
+        ("overall", metric, overall, per_emotion, os.path.join(out_dir, f"{prefix}overall_{metric}_by_model_compact")),
+        ("boxplot", metric, overall, per_emotion, os.path.join(out_dir, f"{prefix}boxplot_per_emotion_{metric}_horizontal")),
+        ("per_emotion", metric, overall, per_emotion, os.path.join(out_dir, f"{prefix}per_emotion_{metric}_compact_legend")),
+    ]
+
+
+def job_hash(job, formats):
+    kind, metric, overall, per_emotion, _ = job
+    payload = json.dumps([RENDER_VERSION, kind, metric, overall, per_emotion, formats], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render(task):
+    # Plotting libraries are only imported by the processes that draw figures
+    import matplotlib
+    matplotlib.use("Agg")
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    job, formats = task
+    kind, metric, overall, per_emotion, out_stem = job
+    column = metric.upper()
+    label = METRIC_LABELS.get(metric, column)
+    df_overall = pd.DataFrame(overall, columns=["Model", column])
+    df_emotion = pd.DataFrame(per_emotion, columns=["Model", "Emotion", column])
+
+    # === Plot Setup ===
+    model_order = df_overall["Model"].tolist()
+    sns.set(style="whitegrid", font_scale=1.2)
+    palette = sns.color_palette("tab10", n_colors=len(model_order))
+    color_dict = dict(zip(model_order, palette))
+
+    if kind == "overall":
+        # === 1. Overall error (vertical) ===
+        plt.figure(figsize=(8, 5))
+        sns.barplot(data=df_overall, x="Model", y=column, palette=color_dict, order=model_order)
+        plt.xticks(rotation=30, ha="right")
+        plt.title(f"Overall {column} by Model", fontsize=14)
+        plt.ylabel(label, fontsize=12)
+        plt.xlabel("")
+        plt.grid(True, axis='y', linestyle='--', alpha=0.7)
+    elif kind == "boxplot":
+        # === 2. Per-Emotion error Boxplot (horizontal) ===
+        plt.figure(figsize=(8, 5))
+        sns.boxplot(data=df_emotion, y="Model", x=column, palette=color_dict, order=model_order)
+        plt.title(f"Per-Emotion {column} Distribution", fontsize=14)
+        plt.xlabel(label, fontsize=12)
+        plt.ylabel("Model", fontsize=12)
+        plt.grid(True, axis='x', linestyle='--', alpha=0.7)
+    else:
+        # === 3. Per-Emotion error per Emotion Category (horizontal barplot with legend) ===
+        emotion_order = df_emotion.groupby("Emotion")[column].mean().sort_values().index.tolist()
+        plt.figure(figsize=(12, 10))
+        sns.barplot(
+            data=df_emotion,
+            x=column,
+            y="Emotion",
+            hue="Model",
+            palette=color_dict,
+            order=emotion_order,
+            hue_order=model_order
+        )
+        plt.title(f"Per-Emotion {column} by Model", fontsize=14)
+        plt.xlabel(label, fontsize=12)
+        plt.ylabel("Emotion", fontsize=12)
+        plt.legend(title="Model", loc='upper right', fontsize=10)
+        plt.grid(True, axis='x', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+    # One figure, saved once per format
+    for fmt in formats:
+        plt.savefig(f"{out_stem}.{fmt}", format=fmt, **SAVE_OPTIONS.get(fmt, {}))
+    plt.close()
+    return out_stem
+
+
+def load_hashes(path=HASH_CACHE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_hashes(hashes, path=HASH_CACHE):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def main(results_paths, gt_path=None, metrics=None, out_dir=".", formats=FORMATS, workers=None, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for path in results_paths:
+        with instrument.stage("load") as stage:
+            data = load_results(path, gt_path, metrics or ["mae"])
+            stage.count()
+        # Several result files get their own file name prefix
+        prefix = "" if len(results_paths) == 1 else os.path.splitext(os.path.basename(path.rstrip("/")))[0] + "_"
+        for metric in result_metrics(data):
+            if metrics is None or metric in metrics:
+                jobs.extend(figure_jobs(data, metric, out_dir, prefix))
+
+    hashes = load_hashes()
+    pending = []
+    for job in jobs:
+        out_stem = os.path.abspath(job[-1])
+        digest = job_hash(job, formats)
+        outputs_exist = all(os.path.exists(f"{job[-1]}.{fmt}") for fmt in formats)
+        if force or hashes.get(out_stem) != digest or not outputs_exist:
+            pending.append((job, digest))
+
+    # Rendering in a pool shows up as children_cpu_s of this stage
+    with instrument.stage("render") as stage:
+        if len(pending) > 1 and workers != 1:
+            with ProcessPoolExecutor(workers) as pool:
+                list(pool.map(render, [(job, formats) for job, _ in pending]))
+        else:
+            for job, _ in pending:
+                render((job, formats))
+        stage.count(len(pending))
+
+    for job, digest in pending:
+        hashes[os.path.abspath(job[-1])] = digest
+    save_hashes(hashes)
+    print(f"Rendered {len(pending)} figures, {len(jobs) - len(pending)} unchanged")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, nargs="+", default=["vila_mae_results.json"],
+                        help="Metric result JSON files, or compiled results stores to evaluate directly")
+    parser.add_argument("--gt", type=str, help="Path to test set JSON (required with a results store)")
+    parser.add_argument("--metric", type=str, nargs="+", choices=sorted(METRIC_LABELS),
+                        help="Metrics to plot (default: every metric in the results; mae for stores)")
+    parser.add_argument("--out-dir", type=str, default=".", help="Directory for the figures")
+    parser.add_argument("--formats", type=str, nargs="+", default=FORMATS, help="File formats of each figure")
+    parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-render figures even if their input is unchanged")
+    instrument.add_trace_argument(parser)
+
+    args = parser.parse_args(argv)
+    if args.gt is None and any(is_store(path) for path in args.results):
+        parser.error("--gt is required when --results is a results store")
+    with instrument.tracing(args.trace, "plot"):
+        main(args.results, args.gt, args.metric, args.out_dir, args.formats, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,165 @@
+import json
+from itertools import islice
+import numpy as np
+from . import instrument
+from .emotion_parser import NUM_EMOTIONS, parse_emotion_batch, drop_incomplete
+
+# Predictions files come in two shapes:
+#   .json  {model: {video: [{"prompt": ..., "prediction": ...}, ...]}}
+#   .jsonl one {"model": ..., "video": ..., "prompt": ..., "prediction": ...} per line
+# Both are read incrementally so memory stays bounded by the chunk size and the
+# largest single prediction entry, not by the size of the file.
+
+CHUNK_SIZE = 1 << 20
+BATCH_SIZE = 4096
+_WHITESPACE = " \t\r\n"
+
+
+class _JsonScanner:
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of predictions file")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in predictions file, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        # Keys are strings and entries are objects, so a decode error can only
+        # mean the value is cut off at the end of the buffer (or the file is bad).
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+    def _members(self, open_char, close_char):
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == close_char:
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or {close_char!r} in predictions file, found {char!r}")
+
+    def iter_keys(self):
+        # Yields each key of an object; the caller must consume its value
+        for _ in self._members("{", "}"):
+            key = self.value()
+            self.expect(":")
+            yield key
+
+    def iter_items(self):
+        for _ in self._members("[", "]"):
+            yield self.value()
+
+
+def _iter_json(path):
+    with open(path, "r") as f:
+        scanner = _JsonScanner(f)
+        for model in scanner.iter_keys():
+            for video in scanner.iter_keys():
+                for entry in scanner.iter_items():
+                    yield model, video, entry
+
+
+def iter_json_array(path):
+    # Streams the items of a top-level JSON array, e.g. a VILA manifest
+    with open(path, "r") as f:
+        yield from _JsonScanner(f).iter_items()
+
+
+def _iter_jsonl(path):
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            model = record.pop("model")
+            video = record.pop("video")
+            yield model, video, record
+
+
+def iter_predictions(path):
+    if path.endswith(".jsonl"):
+        return _iter_jsonl(path)
+    return _iter_json(path)
+
+
+def load_predictions(path):
+    # Materializes the nested {model: {video: [entry, ...]}} dict from either format
+    predictions_data = {}
+    for model, video, entry in iter_predictions(path):
+        predictions_data.setdefault(model, {}).setdefault(video, []).append(entry)
+    return predictions_data
+
+
+def accumulate_scores(records, key_fn, min_emotions=NUM_EMOTIONS, batch_size=BATCH_SIZE):
+    # Sums parsed scores and per-emotion counts for every key_fn(model, video);
+    # records whose key is None are skipped. Memory grows with the number of
+    # distinct keys only, never with the number of predictions.
+    key_rows = {}
+    sums = np.zeros((0, NUM_EMOTIONS), dtype=np.float64)
+    counts = np.zeros((0, NUM_EMOTIONS), dtype=np.int64)
+
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        rows, texts = [], []
+        for model, video, entry in batch:
+            key = key_fn(model, video)
+            if key is None:
+                continue
+            rows.append(key_rows.setdefault(key, len(key_rows)))
+            texts.append(entry["prediction"])
+        if not rows:
+            continue
+
+        if len(key_rows) > len(sums):
+            capacity = max(len(key_rows), 2 * len(sums))
+            sums = np.concatenate([sums, np.zeros((capacity - len(sums), NUM_EMOTIONS))])
+            counts = np.concatenate([counts, np.zeros((capacity - len(counts), NUM_EMOTIONS), dtype=np.int64)])
+
+        with instrument.stage("parse") as parse_stage:
+            scores, mask = parse_emotion_batch(texts, dtype=np.float64)
+            parse_stage.count(len(texts))
+        drop_incomplete(mask, min_emotions)
+        np.add.at(sums, rows, np.where(mask, scores, 0.0))
+        np.add.at(counts, rows, mask)
+
+    n = len(key_rows)
+    return list(key_rows), sums[:n], counts[:n]
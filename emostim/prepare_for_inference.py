@@ -0,0 +1,167 @@
+import os
+import argparse
+from . import instrument
+from .dataset_io import write_json_array, ShardedJsonlWriter, ShardedJsonlReader, SHARD_SIZE, MANIFEST_SUFFIX
+from .prediction_reader import iter_predictions
+from .video_probe import scan_videos, probe_videos, filter_and_order, duration_key
+from .frame_cache import cache_frames, NUM_FRAMES, FRAME_SIZE
+from .constants import PROMPT_TEMPLATES, EMOTION_LIST_TEXT
+from .timeline import window_segments, split_segment
+
+TEST_JSON = "inference.json"
+TEST_SHARDS = "inference"
+INFERENCE_VIDEOS_DIR = 'top5trailers'
+# One line per video in the manifest, so --append does not have to re-read the shards
+VIDEO_LIST_SUFFIX = ".videos.txt"
+
+
+def load_manifest_videos(prefix):
+    list_path = prefix + VIDEO_LIST_SUFFIX
+    if os.path.exists(list_path):
+        with open(list_path, "r") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+    if os.path.exists(prefix + MANIFEST_SUFFIX):
+        return {entry["video"] for entry in ShardedJsonlReader(prefix)}
+    return set()
+
+
+def load_predicted_videos(pred_path):
+    # Predictions of windowed segments count towards their whole video
+    return {split_segment(video)[0] for _, video, _ in iter_predictions(pred_path)}
+
+
+def _normalize(path):
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+class VideoKeys:
+    # Recorded video keys: a library video matches on its scanned path, its path
+    # under the library root, or its file name when the key has no directory
+    # (the layout of vila_results.json), so same-named files in other folders
+    # only match keys that name their folder
+    def __init__(self, keys=()):
+        self.keys = {_normalize(key) for key in keys}
+        self.names = {key for key in self.keys if "/" not in key}
+
+    def __contains__(self, item):
+        video, root = item
+        relative = _normalize(os.path.relpath(video, root))
+        return _normalize(video) in self.keys or relative in self.keys or os.path.basename(video) in self.names
+
+
+def iter_new_videos(videos, root, known=(), predicted=()):
+    known, predicted = VideoKeys(known), VideoKeys(predicted)
+    n_predicted = 0
+    for video in videos:
+        if (video, root) in predicted:
+            n_predicted += 1
+        elif (video, root) not in known:
+            yield video
+    if predicted.keys and not n_predicted:
+        print(f"Warning: none of the {len(predicted.keys)} predicted videos matched a video in {root}")
+
+
+def iter_entries(video_paths, video_log=None, frame_paths=None, segments=None):
+    # With segments ({video: [(start, end)]}), every template is asked once per
+    # segment; a segment's templates are consecutive
+    for video_path in video_paths:
+        if video_log is not None:
+            video_log.write(video_path + "\n")
+        for segment in (segments or {}).get(video_path, [None]):
+            for template in PROMPT_TEMPLATES:
+                prompt = template.format(EMOTION_LIST_TEXT)
+                response = ""
+                entry = {"video": video_path}
+                if segment is not None:
+                    entry["start"], entry["end"] = segment
+                entry["conversations"] = [
+                    {"from": "human", "value": prompt},
+                    {"from": "gpt", "value": response}
+                ]
+                if frame_paths is not None:
+                    entry["frames"] = frame_paths[video_path]
+                yield entry
+
+
+def main(args):
+    known_videos = load_manifest_videos(TEST_SHARDS) if args.append else set()
+    predicted_videos = load_predicted_videos(args.skip_predicted) if args.skip_predicted else set()
+    video_paths = iter_new_videos(scan_videos(args.videos_dir), args.videos_dir, known_videos, predicted_videos)
+    if args.probe or args.sort_by_duration or args.window:
+        with instrument.stage("probe") as stage:
+            video_paths = list(video_paths)
+            infos = probe_videos(video_paths, workers=args.probe_workers)
+            good_paths = filter_and_order(video_paths, infos, args.sort_by_duration)
+            stage.count(len(video_paths))
+        print(f"Dropped {len(video_paths) - len(good_paths)} videos that failed probing")
+        video_paths = good_paths
+
+    segments = None
+    if args.window:
+        # Videos of unknown duration are kept whole
+        segments = {
+            video: window_segments(infos[video].duration, args.window, args.overlap)
+            for video in video_paths if duration_key(infos[video]) > 0
+        }
+        print(f"Split {len(segments)} videos into {sum(map(len, segments.values()))} segments "
+              f"of up to {args.window:g} s")
+
+    frame_paths = None
+    if args.frame_cache:
+        # Videos without frames failed probing or decoding and are left out
+        with instrument.stage("frames") as stage:
+            video_paths = list(video_paths)
+            frame_paths = cache_frames(video_paths, args.frame_cache, args.num_frames, args.frame_size, args.probe_workers)
+            video_paths = [video for video in video_paths if video in frame_paths]
+            stage.count(len(video_paths))
+
+    # Without probing, scanning the videos directory happens while writing
+    if args.format == "jsonl":
+        with instrument.stage("write") as stage:
+            writer = ShardedJsonlWriter(TEST_SHARDS, args.shard_size, append=args.append)
+            n_existing = sum(shard["records"] for shard in writer.shards)
+            with open(TEST_SHARDS + VIDEO_LIST_SUFFIX, "a" if args.append else "w") as video_log:
+                n_entries = writer.write_all(iter_entries(video_paths, video_log, frame_paths, segments)).close()
+            stage.count(n_entries - n_existing)
+        print(f"Saved {n_entries - n_existing} test entries to {TEST_SHARDS}{MANIFEST_SUFFIX} "
+              f"({n_entries} entries in {len(writer.shards)} shards)")
+    else:
+        with instrument.stage("write") as stage:
+            n_entries = write_json_array(TEST_JSON, iter_entries(video_paths, frame_paths=frame_paths, segments=segments))
+            stage.count(n_entries)
+        print(f"Saved {n_entries} test entries to {TEST_JSON}")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos-dir", type=str, default=INFERENCE_VIDEOS_DIR, help="Directory searched recursively for videos")
+    parser.add_argument("--format", type=str, choices=["json", "jsonl"], default="json",
+                        help="Write one VILA JSON file or sharded JSONL with byte-offset indexes")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Records per JSONL shard")
+    parser.add_argument("--append", action="store_true",
+                        help="Only add videos missing from the existing sharded manifest (jsonl format only)")
+    parser.add_argument("--skip-predicted", type=str, help="Skip videos that already appear in this predictions JSON/JSONL")
+    parser.add_argument("--probe", action="store_true", help="Probe videos and drop missing or undecodable ones")
+    parser.add_argument("--sort-by-duration", action="store_true", help="Order videos by duration (implies --probe)")
+    parser.add_argument("--probe-workers", type=int, default=None, help="Probe processes (default: CPU count)")
+    parser.add_argument("--frame-cache", type=str,
+                        help="Decode sampled frames once per video into this directory and reference them from each entry")
+    parser.add_argument("--num-frames", type=int, default=NUM_FRAMES, help="Frames sampled per video for --frame-cache")
+    parser.add_argument("--frame-size", type=int, default=FRAME_SIZE, help="Frame width and height for --frame-cache")
+    parser.add_argument("--window", type=float,
+                        help="Split each video into segments of this many seconds, one set of prompts each (implies --probe)")
+    parser.add_argument("--overlap", type=float, default=0.0, help="Seconds shared by consecutive segments with --window")
+    instrument.add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    if args.append and args.format != "jsonl":
+        parser.error("--append requires --format jsonl")
+    if args.window and args.frame_cache:
+        parser.error("--frame-cache samples whole videos and cannot be combined with --window")
+    if args.window is not None and not 0 <= args.overlap < args.window:
+        parser.error("--window must be positive and longer than --overlap (which must not be negative)")
+    with instrument.tracing(args.trace, "prepare"):
+        main(args)
+
+
+if __name__ == "__main__":
+    cli()
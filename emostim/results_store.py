@@ -0,0 +1,144 @@
+import os
+import json
+import argparse
+from itertools import islice
+import numpy as np
+from .emotion_parser import NUM_EMOTIONS, parse_emotion_batch
+from .prediction_reader import iter_predictions, BATCH_SIZE
+
+# A compiled store is a directory of .npy columns (one row per prediction) plus a
+# store.json holding the string tables and the stamp of the source file:
+#   scores.npy     float32 (N, 16)   parsed scores, 0 where missing
+#   mask.npy       bool    (N, 16)   which emotions were parsed
+#   model_idx.npy  int32   (N,)      index into store.json "models"
+#   video_idx.npy  int32   (N,)      index into store.json "videos"
+#   prompt_idx.npy int32   (N,)      index into store.json "prompts"
+# store.json is written last, so a store without it is incomplete.
+
+STORE_META = "store.json"
+COLUMNS = {
+    "scores": (np.float32, (NUM_EMOTIONS,)),
+    "mask": (np.bool_, (NUM_EMOTIONS,)),
+    "model_idx": (np.int32, ()),
+    "video_idx": (np.int32, ()),
+    "prompt_idx": (np.int32, ()),
+}
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, STORE_META))
+
+
+def source_stamp(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def is_up_to_date(store_path, pred_path):
+    if not is_store(store_path):
+        return False
+    with open(os.path.join(store_path, STORE_META), "r") as f:
+        meta = json.load(f)
+    return meta.get("source") == source_stamp(pred_path)
+
+
+def compile_predictions(pred_path, store_path, force=False, batch_size=BATCH_SIZE):
+    if not force and is_up_to_date(store_path, pred_path):
+        return False
+
+    os.makedirs(store_path, exist_ok=True)
+    meta_path = os.path.join(store_path, STORE_META)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    tables = {"models": {}, "videos": {}, "prompts": {}}
+    tmp_paths = {name: os.path.join(store_path, f"{name}.tmp") for name in COLUMNS}
+    tmp_files = {name: open(path, "wb") for name, path in tmp_paths.items()}
+    n_rows = 0
+    try:
+        records = iter_predictions(pred_path)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            columns = {
+                "model_idx": [tables["models"].setdefault(m, len(tables["models"])) for m, _, _ in batch],
+                "video_idx": [tables["videos"].setdefault(v, len(tables["videos"])) for _, v, _ in batch],
+                "prompt_idx": [tables["prompts"].setdefault(e.get("prompt", ""), len(tables["prompts"]))
+                               for _, _, e in batch],
+            }
+            columns["scores"], columns["mask"] = parse_emotion_batch([e["prediction"] for _, _, e in batch])
+            for name, (dtype, _) in COLUMNS.items():
+                np.asarray(columns[name], dtype=dtype).tofile(tmp_files[name])
+            n_rows += len(batch)
+    finally:
+        for f in tmp_files.values():
+            f.close()
+
+    # Turn the raw column dumps into .npy files without loading them whole
+    for name, (dtype, row_shape) in COLUMNS.items():
+        shape = (n_rows,) + row_shape
+        out = np.lib.format.open_memmap(os.path.join(store_path, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+        if n_rows:
+            out[:] = np.memmap(tmp_paths[name], dtype=dtype, mode="r", shape=shape)
+        out.flush()
+        del out
+        os.remove(tmp_paths[name])
+
+    meta = {name: list(table) for name, table in tables.items()}
+    meta["rows"] = n_rows
+    meta["source"] = source_stamp(pred_path)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return True
+
+
+class ResultsStore:
+    def __init__(self, path, mmap_mode="r"):
+        with open(os.path.join(path, STORE_META), "r") as f:
+            meta = json.load(f)
+        self.path = path
+        self.models = meta["models"]
+        self.videos = meta["videos"]
+        self.prompts = meta["prompts"]
+        self.source = meta["source"]
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def valid_mask(self, min_emotions=NUM_EMOTIONS):
+        mask = np.asarray(self.mask)
+        return mask & (mask.sum(axis=1) >= min_emotions)[:, None]
+
+    def aggregate(self, row_keys, n_keys, min_emotions=NUM_EMOTIONS):
+        # Sums scores and per-emotion valid counts of all rows sharing a key;
+        # rows with a negative key are ignored.
+        keep = row_keys >= 0
+        keys = row_keys[keep]
+        mask = self.valid_mask(min_emotions)[keep]
+        scores = np.asarray(self.scores)[keep]
+        sums = np.zeros((n_keys, NUM_EMOTIONS), dtype=np.float64)
+        counts = np.zeros((n_keys, NUM_EMOTIONS), dtype=np.int64)
+        for e in range(NUM_EMOTIONS):
+            sums[:, e] = np.bincount(keys, weights=np.where(mask[:, e], scores[:, e], 0.0), minlength=n_keys)
+            counts[:, e] = np.bincount(keys, weights=mask[:, e], minlength=n_keys)
+        return sums, counts
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a predictions file into a columnar results store")
+    parser.add_argument("--pred", type=str, required=True, help="Path to predictions JSON or JSONL")
+    parser.add_argument("--out", type=str, required=True, help="Directory to write the store to")
+    parser.add_argument("--force", action="store_true", help="Recompile even if the store is up to date")
+
+    args = parser.parse_args(argv)
+    if compile_predictions(args.pred, args.out, args.force):
+        print(f"Compiled {args.pred} into {args.out}")
+    else:
+        print(f"{args.out} is up to date")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from itertools import islice, groupby
+import urllib.error
+import urllib.request
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .dataset_io import iter_manifest
+from .emotion_parser import parse_emotion_batch, drop_incomplete
+from .prediction_reader import load_predictions
+from .timeline import segment_key, split_segment
+from . import adaptive_sampling
+
+# Drives a VILA manifest (inference.json or sharded JSONL from
+# prepare_for_inference.py) through an OpenAI-compatible /v1/chat/completions
+# endpoint. Up to --concurrency requests are in flight at once; each completed
+# record is appended straight away to a predictions JSONL
+# ({"model", "video", "prompt", "prediction"} per line, read by get_scores.py and
+# compute_vila_error.py), which is flushed to disk after every batch. On restart,
+# (video, prompt) pairs already in the JSONL for the model are skipped.
+#
+# With --adaptive, each video's templates are issued in a random order and the
+# video stops early once its per-emotion confidence intervals are narrower than
+# --tolerance (see adaptive_sampling.py); templates used per video are saved to
+# --summary next to the averaged scores.
+
+ENDPOINT = "http://localhost:8000/v1/chat/completions"
+OUT_JSONL = "vila_results.jsonl"
+CONCURRENCY = 8
+BATCH_SIZE = 64
+MAX_RETRIES = 5
+TIMEOUT = 600
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def entry_video(entry):
+    # Records and adaptive summaries are keyed by the manifest path (plus the
+    # time range of a segment), so same-named videos in different folders stay
+    # apart. Windowed manifests give each entry a start and end within the video.
+    if "start" in entry:
+        return segment_key(entry["video"], entry["start"], entry["end"])
+    return entry["video"]
+
+
+def video_url(video, url_prefix=None):
+    # A segment's time range is passed on as a #t=start,end media fragment
+    if url_prefix is not None:
+        return url_prefix + video
+    path, start, end = split_segment(video)
+    url = Path(path).resolve().as_uri()
+    return url if start is None else segment_key(url, start, end)
+
+
+def load_completed(out_path, model):
+    # Returns {(video, prompt): prediction} for records already answered for
+    # model. A last line without its newline was cut off by a crash mid-write
+    # and is dropped from the file so appends start cleanly; unreadable lines
+    # before it are skipped.
+    done = {}
+    if not os.path.exists(out_path):
+        return done
+    good_end = 0
+    unreadable = 0
+    with open(out_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            good_end += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                key, prediction = (record["video"], record["prompt"]), record["prediction"]
+                record_model = record["model"]
+            except (ValueError, KeyError, TypeError):
+                unreadable += 1
+                continue
+            if record_model == model:
+                done[key] = prediction
+    if unreadable:
+        print(f"Skipped {unreadable} unreadable lines in {out_path}")
+    if good_end < os.path.getsize(out_path):
+        with open(out_path, "r+b") as f:
+            f.truncate(good_end)
+    return done
+
+
+def entry_prompt(entry):
+    return next(conv["value"] for conv in entry["conversations"] if conv["from"] == "human")
+
+
+def iter_pending(entries, done, stats):
+    for entry in entries:
+        prompt = entry_prompt(entry)
+        video = entry_video(entry)
+        if (video, prompt) in done:
+            stats.skipped += 1
+        else:
+            yield video, prompt
+
+
+def iter_video_prompts(entries):
+    # Manifests list all templates of a video (or segment) consecutively
+    for video, group in groupby(entries, key=entry_video):
+        yield video, [entry_prompt(entry) for entry in group]
+
+
+def build_request(model, video, prompt, args):
+    return {
+        "model": model,
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "video_url", "video_url": {"url": video_url(video, args.video_url_prefix)}},
+                {"type": "text", "text": prompt},
+            ],
+        }],
+        "max_tokens": args.max_tokens,
+        "temperature": args.temperature,
+    }
+
+
+def post_json(url, payload, api_key=None, timeout=TIMEOUT):
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    request = urllib.request.Request(url, json.dumps(payload).encode("utf-8"), headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+async def complete(payload, args):
+    # Retries connection errors, timeouts and retryable HTTP statuses with
+    # jittered exponential backoff; other HTTP errors fail the record at once
+    for attempt in range(args.max_retries + 1):
+        try:
+            return await asyncio.to_thread(post_json, args.endpoint, payload, args.api_key, args.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt == args.max_retries:
+                raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == args.max_retries:
+                raise
+        await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+
+
+class Stats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.requests = 0
+        self.failed = 0
+        self.skipped = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (f"{self.requests} requests ({self.failed} failed) in {elapsed:.1f}s: "
+                f"{self.requests / elapsed:.2f} req/s, {self.completion_tokens / elapsed:.1f} tokens/s "
+                f"({self.prompt_tokens} prompt / {self.completion_tokens} completion tokens)")
+
+
+async def run_one(video, prompt, args, semaphore, out_file, stats):
+    async with semaphore:
+        try:
+            response = await complete(build_request(args.model, video, prompt, args), args)
+            # A body without a message counts as a failed request
+            prediction = response["choices"][0]["message"]["content"]
+            if not isinstance(prediction, str):
+                raise ValueError("response has no message content")
+            usage = response.get("usage") or {}
+        except Exception as e:
+            stats.failed += 1
+            print(f"Failed {video}: {type(e).__name__}: {e}")
+            return None
+    stats.requests += 1
+    stats.prompt_tokens += usage.get("prompt_tokens", 0)
+    stats.completion_tokens += usage.get("completion_tokens", 0)
+    record = {
+        "model": args.model_name,
+        "video": video,
+        "prompt": prompt,
+        "prediction": prediction,
+    }
+    # Writes happen on the event loop thread, so lines never interleave
+    out_file.write(json.dumps(record) + "\n")
+    return record["prediction"]
+
+
+async def run_video(video, prompts, args, done, semaphore, out_file, stats):
+    # Queries templates in the video's random order until the stopping rule
+    # fires; the first min_templates go out together, then one at a time.
+    # Answers already in the results file are replayed instead of re-requested.
+    order = [prompts[i] for i in adaptive_sampling.template_order(len(prompts), video, args.seed)]
+    running = adaptive_sampling.RunningStats()
+    while order and not running.done(args.tolerance, args.min_templates, args.max_templates):
+        wave_size = max(1, min(args.min_templates, args.max_templates) - running.calls)
+        wave, order = order[:wave_size], order[wave_size:]
+        stats.skipped += sum((video, prompt) in done for prompt in wave)
+        predictions = await asyncio.gather(*(
+            asyncio.sleep(0, done[video, prompt]) if (video, prompt) in done
+            else run_one(video, prompt, args, semaphore, out_file, stats)
+            for prompt in wave
+        ))
+        predictions = [prediction for prediction in predictions if prediction is not None]
+        if not predictions:
+            continue
+        scores, mask = parse_emotion_batch(predictions, dtype=np.float64)
+        drop_incomplete(mask)
+        for row_scores, row_mask in zip(scores, mask):
+            running.update(row_scores, row_mask)
+    return video, running
+
+
+async def run(args):
+    done = load_completed(args.out, args.model_name)
+    entries = iter_manifest(args.manifest, args.rank, args.world_size)
+    # Each in-flight request holds one blocking urllib call in a worker thread
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.concurrency))
+    semaphore = asyncio.Semaphore(args.concurrency)
+    stats = Stats()
+    video_stats = {}
+    with open(args.out, "a") as out_file:
+        if args.adaptive:
+            videos = iter_video_prompts(entries)
+            while True:
+                batch = list(islice(videos, args.batch_size))
+                if not batch:
+                    break
+                video_stats.update(await asyncio.gather(*(
+                    run_video(video, prompts, args, done, semaphore, out_file, stats) for video, prompts in batch
+                )))
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                print(stats.report())
+        else:
+            pending = iter_pending(entries, done, stats)
+            while True:
+                batch = list(islice(pending, args.batch_size))
+                if not batch:
+                    break
+                await asyncio.gather(*(run_one(video, prompt, args, semaphore, out_file, stats) for video, prompt in batch))
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                print(stats.report())
+    print(f"Skipped {stats.skipped} completed records; {stats.report()}")
+
+    if args.adaptive:
+        summary = adaptive_sampling.summarize(video_stats, args.tolerance, args.min_templates)
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+        used = sum(video["templates_used"] for video in summary.values())
+        print(f"Used {used} templates for {len(summary)} videos; saved {args.summary}")
+    return stats
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Run a VILA manifest against an OpenAI-compatible chat endpoint")
+    parser.add_argument("--manifest", type=str, default="inference.json",
+                        help="inference.json, a JSONL manifest, or a sharded JSONL prefix")
+    parser.add_argument("--model", type=str, required=True, help="Model name sent to the endpoint")
+    parser.add_argument("--model-name", type=str, help="Model key written to the results (default: --model)")
+    parser.add_argument("--endpoint", type=str, default=ENDPOINT, help="Chat completions URL")
+    parser.add_argument("--api-key", type=str, default=os.environ.get("OPENAI_API_KEY"), help="Bearer token")
+    parser.add_argument("--out", type=str, default=OUT_JSONL, help="Predictions JSONL, appended to and resumed from")
+    parser.add_argument("--export-json", type=str,
+                        help="Also write all results in the nested vila_results.json layout when done")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Maximum requests in flight")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Records (videos with --adaptive) scheduled per batch; results are synced to disk after each batch")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="Retries per request")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="Per-request timeout in seconds")
+    parser.add_argument("--max-tokens", type=int, default=512, help="Completion token limit")
+    parser.add_argument("--temperature", type=float, default=0.0, help="Sampling temperature")
+    parser.add_argument("--video-url-prefix", type=str,
+                        help="Prefix prepended to manifest video paths (default: absolute file:// URLs)")
+    parser.add_argument("--rank", type=int, default=0, help="Worker rank (sharded manifests)")
+    parser.add_argument("--world-size", type=int, default=1, help="Number of workers (sharded manifests)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Stop querying a video once every emotion's confidence interval is within --tolerance")
+    parser.add_argument("--tolerance", type=float, default=adaptive_sampling.TOLERANCE,
+                        help="Target CI half-width per emotion (--adaptive)")
+    parser.add_argument("--min-templates", type=int, default=adaptive_sampling.MIN_TEMPLATES,
+                        help="Templates queried before stopping is considered (--adaptive)")
+    parser.add_argument("--max-templates", type=int, default=adaptive_sampling.MAX_TEMPLATES,
+                        help="Cap on templates per video (--adaptive)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the per-video template order (--adaptive)")
+    parser.add_argument("--summary", type=str,
+                        help="Adaptive per-video scores and templates used (default: <out stem>.adaptive.json)")
+
+    args = parser.parse_args(argv)
+    args.summary = args.summary or os.path.splitext(args.out)[0] + ".adaptive.json"
+    args.model_name = args.model_name or args.model
+    asyncio.run(run(args))
+
+    if args.export_json:
+        with open(args.export_json, "w") as f:
+            json.dump(load_predictions(args.out), f, indent=2)
+        print(f"Exported results to {args.export_json}")
+
+
+if __name__ == "__main__":
+    cli()
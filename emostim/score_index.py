@@ -0,0 +1,199 @@
+import os
+import json
+import argparse
+import numpy as np
+from .emotion_parser import EMOTION_KEYS, NUM_EMOTIONS, label_to_index
+
+# Persistent index of per-video averaged scores for one or more models:
+#   scores.npy float32 (N, 16)  averaged scores, NaN where a video had no valid response
+#   order.npy  int32   (16, N)  per emotion, row ids sorted by descending score within
+#                               each model's block of rows (NaN last)
+#   index.json                  models, per-model row offsets and the video id per row
+# Rows are grouped by model, so every query works on one contiguous slice.
+# index.json is written last, so an index without it is incomplete.
+
+INDEX_META = "index.json"
+
+
+def is_index(path):
+    return os.path.isfile(os.path.join(path, INDEX_META))
+
+
+def emotion_index(emotion):
+    idx = label_to_index(emotion)
+    if idx is None:
+        raise KeyError(f"Unknown emotion: {emotion}")
+    return idx
+
+
+def write_index(path, model_scores):
+    # model_scores: {model: (video ids, (videos, 16) averaged scores)}
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, INDEX_META)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    models, offsets, videos, blocks = [], [0], [], []
+    for model, (video_ids, scores) in model_scores.items():
+        models.append(model)
+        videos.extend(str(video) for video in video_ids)
+        blocks.append(np.asarray(scores, dtype=np.float32).reshape(-1, NUM_EMOTIONS))
+        offsets.append(offsets[-1] + len(blocks[-1]))
+    scores = np.concatenate(blocks) if blocks else np.zeros((0, NUM_EMOTIONS), dtype=np.float32)
+
+    order = np.empty((NUM_EMOTIONS, len(scores)), dtype=np.int32)
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        # Stable sort of the negated scores: descending, ties in insertion order
+        order[:, start:end] = start + np.argsort(-scores[start:end].T, axis=1, kind="stable")
+
+    np.save(os.path.join(path, "scores.npy"), scores)
+    np.save(os.path.join(path, "order.npy"), order)
+    with open(meta_path, "w") as f:
+        json.dump({"models": models, "offsets": offsets, "videos": videos}, f)
+
+
+class ScoreIndex:
+    def __init__(self, path, mmap_mode="r"):
+        with open(os.path.join(path, INDEX_META), "r") as f:
+            meta = json.load(f)
+        self.models = meta["models"]
+        self.offsets = meta["offsets"]
+        self.videos = meta["videos"]
+        self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode=mmap_mode)
+        self.order = np.load(os.path.join(path, "order.npy"), mmap_mode=mmap_mode)
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.videos)
+
+    def model_slice(self, model):
+        if model not in self.models:
+            raise KeyError(model)
+        i = self.models.index(model)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def model_scores(self, model):
+        # {video: (16,) scores} of one model, as get_scores.py would write them
+        rows = self.model_slice(model)
+        return dict(zip(self.videos[rows], np.asarray(self.scores[rows])))
+
+    def row(self, model, video):
+        if model not in self._rows:
+            rows = self.model_slice(model)
+            self._rows[model] = {v: rows.start + i for i, v in enumerate(self.videos[rows])}
+        return self._rows[model][video]
+
+    def profile(self, model, video):
+        return np.asarray(self.scores[self.row(model, video)])
+
+    def _results(self, rows, values=None):
+        scores = np.asarray(self.scores[rows])
+        if values is None:
+            values = [None] * len(rows)
+        return [
+            (self.videos[row], None if value is None else float(value), score)
+            for row, value, score in zip(rows, values, scores)
+        ]
+
+    def top_k(self, model, emotion, k=10, lowest=False):
+        # [(video, score, profile)] with the k highest (or lowest) scores
+        e = emotion_index(emotion)
+        rows = self.order[e, self.model_slice(model)]
+        if lowest:
+            n_valid = int(np.count_nonzero(~np.isnan(self.scores[rows, e])))
+            rows = rows[:n_valid][::-1]
+        rows = np.asarray(rows[:k])
+        return self._results(rows, self.scores[rows, e])
+
+    def filter(self, model, ranges, limit=None):
+        # Videos whose scores lie in [low, high] for every {emotion: (low, high)};
+        # the first range is cut from the sorted index by binary search, the rest
+        # are checked on those candidates. Results are sorted by the first emotion.
+        ranges = [(emotion_index(emotion), low, high) for emotion, (low, high) in ranges.items()]
+        block = self.model_slice(model)
+        rows = np.arange(block.start, block.stop)
+        if ranges:
+            e, low, high = ranges[0]
+            rows = np.asarray(self.order[e, block])
+            descending = -np.asarray(self.scores[rows, e])
+            start = np.searchsorted(descending, -high, side="left")
+            stop = np.searchsorted(descending, -low, side="right")
+            rows = rows[start:stop]
+            for e, low, high in ranges[1:]:
+                values = self.scores[rows, e]
+                rows = rows[(values >= low) & (values <= high)]
+        rows = rows[:limit]
+        return self._results(rows, self.scores[rows, ranges[0][0]] if ranges else None)
+
+    def nearest(self, model, query, k=10, metric="cosine", exclude=None):
+        # k most similar profiles to a (16,) query vector; metric is "cosine"
+        # (similarity, higher is closer) or "l2" (distance, lower is closer)
+        rows = self.model_slice(model)
+        scores = np.asarray(self.scores[rows], dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        if metric == "cosine":
+            norms = np.linalg.norm(scores, axis=1) * np.linalg.norm(query)
+            distance = -(scores @ query) / np.where(norms > 0, norms, np.inf)
+        elif metric == "l2":
+            distance = np.sqrt(np.square(scores - query).sum(axis=1))
+        else:
+            raise ValueError(f"Unknown metric: {metric}")
+        distance[np.isnan(distance)] = np.inf
+        if exclude is not None:
+            distance[self.row(model, exclude) - rows.start] = np.inf
+
+        k = min(k, int(np.isfinite(distance).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(distance, k - 1)[:k]
+        best = best[np.argsort(distance[best], kind="stable")]
+        values = -distance[best] if metric == "cosine" else distance[best]
+        return self._results(rows.start + best, values)
+
+
+def print_results(results):
+    for video, value, scores in results:
+        profile = ", ".join(f"{score:.2f}" for score in scores)
+        print(f"{video}\t{'' if value is None else f'{value:.4f}'}\t{profile}")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Query a per-video emotion score index built by `emostim scores --store`")
+    parser.add_argument("--index", type=str, required=True, help="Score index directory")
+    parser.add_argument("--model", type=str, help="Model to query (default: the only/first model in the index)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    top_parser = subparsers.add_parser("top", help="Top-k videos for one emotion")
+    top_parser.add_argument("emotion", type=str, help="Emotion label, e.g. Fear or 'Fearful / Scared / Afraid'")
+    top_parser.add_argument("-k", type=int, default=10, help="Number of videos")
+    top_parser.add_argument("--lowest", action="store_true", help="Lowest instead of highest scores")
+
+    range_parser = subparsers.add_parser("range", help="Videos with scores inside the given ranges")
+    range_parser.add_argument("--where", nargs=3, action="append", metavar=("EMOTION", "LOW", "HIGH"), required=True,
+                              help="Keep videos with LOW <= EMOTION <= HIGH (repeatable)")
+    range_parser.add_argument("--limit", type=int, default=None, help="Maximum number of videos")
+
+    near_parser = subparsers.add_parser("nearest", help="Videos with the closest emotion profile")
+    near_parser.add_argument("--video", type=str, help="Use this indexed video's profile as the query")
+    near_parser.add_argument("--profile", type=float, nargs=NUM_EMOTIONS, help="Query profile (16 scores)")
+    near_parser.add_argument("-k", type=int, default=10, help="Number of videos")
+    near_parser.add_argument("--metric", type=str, choices=["cosine", "l2"], default="cosine", help="Similarity measure")
+
+    args = parser.parse_args(argv)
+    index = ScoreIndex(args.index)
+    model = args.model or index.models[0]
+    print("video\tvalue\t" + ", ".join(EMOTION_KEYS))
+    if args.command == "top":
+        print_results(index.top_k(model, args.emotion, args.k, args.lowest))
+    elif args.command == "range":
+        ranges = {emotion: (float(low), float(high)) for emotion, low, high in args.where}
+        print_results(index.filter(model, ranges, args.limit))
+    else:
+        if (args.video is None) == (args.profile is None):
+            parser.error("nearest needs exactly one of --video or --profile")
+        query = index.profile(model, args.video) if args.video else args.profile
+        print_results(index.nearest(model, query, args.k, args.metric, exclude=args.video))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Clip-level train/test splits for `emostim convert`. Every strategy returns
+# a list of (train clips, test clips) pairs, one per fold, computed once from the
+# clip list. The holdout split is the original single train_test_split, and
+# repeat 0 of the repeated splits is that same holdout.
+
+STRATEGIES = ["holdout", "kfold", "repeated", "stratified"]
+TEST_SIZE = 0.2
+SEED = 42
+FOLDS = 5
+REPEATS = 5
+
+
+def holdout_split(clips, test_size=TEST_SIZE, seed=SEED):
+    from sklearn.model_selection import train_test_split
+    return [tuple(train_test_split(clips, test_size=test_size, random_state=seed))]
+
+
+def repeated_splits(clips, n_repeats=REPEATS, test_size=TEST_SIZE, seed=SEED):
+    from sklearn.model_selection import train_test_split
+    return [
+        tuple(train_test_split(clips, test_size=test_size, random_state=seed + repeat))
+        for repeat in range(n_repeats)
+    ]
+
+
+def _folds_from_assignment(clips, fold_of, n_folds):
+    return [(clips[fold_of != fold], clips[fold_of == fold]) for fold in range(n_folds)]
+
+
+def kfold_splits(clips, n_folds=FOLDS, seed=SEED):
+    from sklearn.model_selection import KFold
+    fold_of = np.empty(len(clips), dtype=np.int64)
+    for fold, (_, test) in enumerate(KFold(n_folds, shuffle=True, random_state=seed).split(clips)):
+        fold_of[test] = fold
+    return _folds_from_assignment(clips, fold_of, n_folds)
+
+
+def dominant_emotion(scores, min_count):
+    # Strongest emotion per clip; emotions that dominate fewer than min_count
+    # clips are pooled into one extra class so every class fits in every fold
+    labels = np.argmax(scores, axis=1)
+    counts = np.bincount(labels, minlength=scores.shape[1])
+    return np.where(counts[labels] >= min_count, labels, scores.shape[1])
+
+
+def stratified_splits(clips, scores, n_folds=FOLDS, seed=SEED):
+    from sklearn.model_selection import StratifiedKFold
+    labels = dominant_emotion(scores, n_folds)
+    fold_of = np.empty(len(clips), dtype=np.int64)
+    splitter = StratifiedKFold(n_folds, shuffle=True, random_state=seed)
+    for fold, (_, test) in enumerate(splitter.split(clips, labels)):
+        fold_of[test] = fold
+    return _folds_from_assignment(clips, fold_of, n_folds)
+
+
+def make_splits(strategy, clips, scores=None, n_folds=FOLDS, n_repeats=REPEATS, test_size=TEST_SIZE, seed=SEED):
+    clips = np.asarray(clips)
+    if strategy == "holdout":
+        return holdout_split(clips, test_size, seed)
+    if strategy == "repeated":
+        return repeated_splits(clips, n_repeats, test_size, seed)
+    if strategy == "kfold":
+        return kfold_splits(clips, n_folds, seed)
+    if strategy == "stratified":
+        return stratified_splits(clips, scores, n_folds, seed)
+    raise ValueError(f"Unknown split strategy: {strategy}")
+
+
+def fold_path(path, fold, n_splits):
+    # dataset.json -> dataset-fold0.json when there is more than one split
+    if n_splits == 1:
+        return path
+    stem, dot, ext = path.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{path}-fold{fold}"
+    return f"{stem}-fold{fold}.{ext}"
@@ -0,0 +1,159 @@
+import re
+import argparse
+import numpy as np
+from .constants import EMOTION_KEYS, NUM_EMOTIONS
+
+# Windowed inference splits each video into time segments (`emostim prepare
+# --window`), so a long trailer becomes many short requests that can run on any
+# worker. A segment travels through manifests and predictions as
+# "<video>#t=<start>,<end>" (a media fragment, seconds), and its predictions are
+# averaged like any other video. Timeline collects the segment averages of each
+# (model, video) in start order and stores them as one compact npz:
+#   models   str     (R,)       model of each row
+#   videos   str     (R,)       video of each row
+#   offsets  int64   (R + 1,)   segments of row r are offsets[r]:offsets[r + 1]
+#   starts   float32 (S,)       segment start, seconds
+#   ends     float32 (S,)       segment end, seconds
+#   scores   float32 (S, 16)    average score per segment, NaN without a valid response
+# The per-video summary is the mean over segments weighted by segment length.
+
+MIN_SEGMENT = 1.0
+_FRAGMENT_RE = re.compile(r"#t=(\d+(?:\.\d*)?),(\d+(?:\.\d*)?)$")
+
+
+def format_time(seconds):
+    return f"{seconds:.3f}".rstrip("0").rstrip(".")
+
+
+def segment_key(video, start, end):
+    return f"{video}#t={format_time(start)},{format_time(end)}"
+
+
+def split_segment(key):
+    # (video, start, end); start and end are None for a whole-video key
+    match = _FRAGMENT_RE.search(key)
+    if match is None:
+        return key, None, None
+    return key[:match.start()], float(match.group(1)), float(match.group(2))
+
+
+def window_segments(duration, window, overlap=0.0, min_segment=MIN_SEGMENT):
+    # [(start, end)] windows covering [0, duration]; a tail shorter than
+    # min_segment is merged into the window before it
+    stride = window - overlap
+    if window <= 0 or stride <= 0:
+        raise ValueError("window must be positive and longer than the overlap")
+    segments = []
+    for i in range(int(np.ceil(max(duration - overlap, 0.0) / stride)) or 1):
+        start = i * stride
+        segments.append((round(float(start), 3), round(float(min(start + window, duration)), 3)))
+    if len(segments) > 1 and segments[-1][1] - segments[-1][0] < min_segment:
+        tail = segments.pop()
+        segments[-1] = (segments[-1][0], tail[1])
+    return segments
+
+
+class Timeline:
+    def __init__(self, models, videos, offsets, starts, ends, scores):
+        self.models = [str(model) for model in models]
+        self.videos = [str(video) for video in videos]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.float32)
+        self.ends = np.asarray(ends, dtype=np.float32)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(len(self.starts), NUM_EMOTIONS)
+        self.index = {(model, video): r for r, (model, video) in enumerate(zip(self.models, self.videos))}
+
+    def __len__(self):
+        return len(self.videos)
+
+    @classmethod
+    def from_scores(cls, model_scores):
+        # Builds rows from the segment keys of {model: (keys, (K, 16) averages)};
+        # whole-video keys are ignored
+        rows = {}
+        for model, (keys, scores) in model_scores.items():
+            for key, row in zip(keys, scores):
+                video, start, end = split_segment(key)
+                if start is not None:
+                    rows.setdefault((model, video), []).append((start, end, row))
+        segments = [sorted(row_segments, key=lambda segment: segment[0]) for row_segments in rows.values()]
+        flat = [segment for row_segments in segments for segment in row_segments]
+        return cls(
+            [model for model, _ in rows],
+            [video for _, video in rows],
+            np.concatenate([[0], np.cumsum([len(row_segments) for row_segments in segments], dtype=np.int64)]),
+            [start for start, _, _ in flat],
+            [end for _, end, _ in flat],
+            np.array([scores for _, _, scores in flat]).reshape(len(flat), NUM_EMOTIONS),
+        )
+
+    def row(self, model, video):
+        # (starts, ends, (segments, 16) scores) of one video
+        r = self.index[model, video]
+        rows = slice(self.offsets[r], self.offsets[r + 1])
+        return self.starts[rows], self.ends[rows], self.scores[rows]
+
+    def summary(self):
+        # (rows, 16) length-weighted mean over each row's segments, NaN where no
+        # segment has a valid score for an emotion
+        if not len(self):
+            return np.zeros((0, NUM_EMOTIONS))
+        valid = ~np.isnan(self.scores)
+        weights = np.where(valid, (self.ends - self.starts).astype(np.float64)[:, None], 0.0)
+        sums = np.add.reduceat(np.where(valid, self.scores, 0.0) * weights, self.offsets[:-1], axis=0)
+        total = np.add.reduceat(weights, self.offsets[:-1], axis=0)
+        return np.divide(sums, total, out=np.full(sums.shape, np.nan), where=total > 0)
+
+    def merge_summary(self, model_scores):
+        # model_scores with each model's segment keys replaced by one summary
+        # row per video, after the model's whole-video keys
+        summary = self.summary()
+        merged = {}
+        for model, (keys, scores) in model_scores.items():
+            whole = [i for i, key in enumerate(keys) if split_segment(key)[1] is None]
+            rows = [r for r, row_model in enumerate(self.models) if row_model == model]
+            merged[model] = (
+                [keys[i] for i in whole] + [self.videos[r] for r in rows],
+                np.concatenate([scores[whole], summary[rows]]),
+            )
+        return merged
+
+    def save(self, path):
+        np.savez(
+            path,
+            models=np.array(self.models, dtype=str),
+            videos=np.array(self.videos, dtype=str),
+            offsets=self.offsets,
+            starts=self.starts,
+            ends=self.ends,
+            scores=self.scores,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["models"], data["videos"], data["offsets"], data["starts"], data["ends"], data["scores"])
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Print the emotion timeline of a video from `emostim scores --timeline`")
+    parser.add_argument("--timeline", type=str, required=True, help="Timeline .npz")
+    parser.add_argument("--video", type=str, help="Video to print (default: list the videos)")
+    parser.add_argument("--model", type=str, help="Model (default: the first model of the video)")
+
+    args = parser.parse_args(argv)
+    timeline = Timeline.load(args.timeline)
+    if args.video is None:
+        for r, (model, video) in enumerate(zip(timeline.models, timeline.videos)):
+            n_segments = timeline.offsets[r + 1] - timeline.offsets[r]
+            print(f"{model}\t{video}\t{n_segments} segments, {timeline.ends[timeline.offsets[r + 1] - 1]:.1f} s")
+        return
+    model = args.model or next(model for model, video in timeline.index if video == args.video)
+    starts, ends, scores = timeline.row(model, args.video)
+    print("start\tend\t" + ", ".join(EMOTION_KEYS))
+    for start, end, row in zip(starts, ends, scores):
+        print(f"{start:.1f}\t{end:.1f}\t" + ", ".join(f"{score:.2f}" for score in row))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,191 @@
+import os
+import json
+import math
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Probes videos with ffprobe/ffmpeg in a process pool (existence, size, duration,
+# fps, resolution, first-frame decode, content hash) and caches the results in a
+# SQLite index keyed by path; a row is reused while the file's mtime and size
+# are unchanged.
+
+DB_PATH = ".cache/video_probe.sqlite"
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v", ".mpg", ".mpeg"}
+PROBE_TIMEOUT = 60
+# The content hash covers the file size plus HASH_CHUNK bytes from the start,
+# middle and end of the file, which is enough to tell re-encoded or replaced
+# videos apart without reading multi-GB files in full.
+HASH_CHUNK = 1 << 22
+
+VideoInfo = namedtuple(
+    "VideoInfo",
+    ["path", "mtime_ns", "size", "ok", "error", "duration", "fps", "width", "height", "content_hash"],
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER,
+    ok INTEGER,
+    error TEXT,
+    duration REAL,
+    fps REAL,
+    width INTEGER,
+    height INTEGER,
+    content_hash TEXT
+)
+"""
+
+
+def scan_videos(root):
+    # Depth-first walk with os.scandir, yielding "<root>/<relative path>" per video
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            subdirs = []
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS:
+                    yield entry.path.replace(os.sep, "/")
+            stack.extend(reversed(subdirs))
+
+
+def content_hash(path, size):
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - HASH_CHUNK // 2), max(0, size - HASH_CHUNK)}):
+            f.seek(offset)
+            digest.update(f.read(HASH_CHUNK))
+    return digest.hexdigest()
+
+
+def _parse_rate(rate):
+    num, _, den = (rate or "0/0").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_video(path):
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return VideoInfo(path, None, None, False, f"missing: {e.strerror}", None, None, None, None, None)
+
+    def failed(error):
+        return VideoInfo(path, st.st_mtime_ns, st.st_size, False, error, None, None, None, None, None)
+
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,avg_frame_rate:format=duration",
+        "-of", "json", path,
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+        if proc.returncode != 0:
+            return failed(proc.stderr.strip() or f"ffprobe exited with {proc.returncode}")
+        data = json.loads(proc.stdout)
+        if not data.get("streams"):
+            return failed("no video stream")
+        stream = data["streams"][0]
+
+        # Decoding the first frame catches files whose headers are fine but whose
+        # video data is not
+        decode = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", path, "-map", "0:v:0", "-frames:v", "1", "-f", "null", "-"],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+        )
+        if decode.returncode != 0:
+            return failed(decode.stderr.strip() or "first frame does not decode")
+
+        duration = float(data.get("format", {}).get("duration") or "nan")
+        return VideoInfo(
+            path, st.st_mtime_ns, st.st_size, True, None, duration,
+            _parse_rate(stream.get("avg_frame_rate")), stream.get("width"), stream.get("height"),
+            content_hash(path, st.st_size),
+        )
+    except (subprocess.TimeoutExpired, ValueError, OSError) as e:
+        return failed(f"{type(e).__name__}: {e}")
+
+
+def _open_db(db_path):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def probe_videos(paths, db_path=DB_PATH, workers=None):
+    # Returns {path: VideoInfo}, probing only videos that are new or changed
+    if not (shutil.which("ffprobe") and shutil.which("ffmpeg")):
+        raise RuntimeError("Probing videos requires ffprobe and ffmpeg on PATH")
+
+    results, stale = {}, []
+    conn = _open_db(db_path)
+    try:
+        for path in dict.fromkeys(paths):
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                results[path] = VideoInfo(path, None, None, False, f"missing: {e.strerror}",
+                                          None, None, None, None, None)
+                continue
+            row = conn.execute("SELECT * FROM probes WHERE path = ?", (path,)).fetchone()
+            if row and row[1] == st.st_mtime_ns and row[2] == st.st_size:
+                info = VideoInfo(*row)
+                results[path] = info._replace(ok=bool(info.ok))
+            else:
+                stale.append(path)
+
+        if stale:
+            with ProcessPoolExecutor(workers) as pool:
+                for info in pool.map(probe_video, stale, chunksize=8):
+                    results[info.path] = info
+                    if info.mtime_ns is not None:
+                        conn.execute("INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", info)
+            conn.commit()
+    finally:
+        conn.close()
+    return results
+
+
+def filter_and_order(paths, infos, sort_by_duration=False):
+    # Drops videos that failed probing; optionally orders the rest by duration
+    # so consecutive batches hold videos of similar length
+    good = [path for path in paths if infos[path].ok]
+    if sort_by_duration:
+        good.sort(key=lambda path: duration_key(infos[path]))
+    return good
+
+
+def duration_key(info):
+    # Unknown durations sort first
+    return 0.0 if info.duration is None or math.isnan(info.duration) else info.duration
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Probe videos and refresh the cached probe index")
+    parser.add_argument("--videos-dir", type=str, required=True, help="Directory searched recursively for videos")
+    parser.add_argument("--db", type=str, default=DB_PATH, help="SQLite probe index")
+    parser.add_argument("--workers", type=int, default=None, help="Probe processes (default: CPU count)")
+
+    args = parser.parse_args(argv)
+    infos = probe_videos(scan_videos(args.videos_dir), args.db, args.workers)
+    bad = [info for info in infos.values() if not info.ok]
+    total = sum(info.duration or 0.0 for info in infos.values() if info.ok)
+    print(f"Probed {len(infos)} videos: {len(infos) - len(bad)} ok, {len(bad)} bad, {total / 3600:.1f} h total")
+    for info in bad:
+        print(f"  {info.path}: {info.error}")
+
+
+if __name__ == "__main__":
+    cli()